@@ -1,13 +1,191 @@
 from celery import Celery
+from celery.backends.redis import RedisBackend
+from celery.exceptions import Retry
+from celery.signals import before_task_publish, worker_init
+from celery.signals import worker_process_init, worker_process_shutdown
+from celery.signals import worker_shutdown
+from celery.worker.control import inspect_command
+import json
 import logging
+import os
+import redis
+import socket
+import threading
+import time
 from flask import Flask
-from typing import Any
+from metrics import Histogram
+from typing import Any, Dict, Optional
+
+# Message header used to carry the enqueue wall-clock time to the worker.
+ENQUEUED_AT_HEADER: str = 'enqueued_at'
+
+# Prefix of the Redis hashes where pool child processes publish their task
+# metrics for the worker's main process to add up.
+METRICS_KEY_PREFIX: str = 'celery:task_metrics'
+
+# Seconds the published metrics of a worker are kept after its last task.
+METRICS_KEY_TTL: int = 86400
+
+# Seconds between publications of a pool child's metrics, so that tasks do
+# not pay for a Redis round trip each.
+METRICS_PUBLISH_INTERVAL: float = 5.0
+
+
+class TaskMetrics:
+    """
+    Aggregates per-task instrumentation recorded by ContextTask.
+
+    For every task name it keeps histograms of the time spent waiting in the
+    queue, the time spent running, and the time spent pushing and popping the
+    Flask application context, along with success, failure and retry counts.
+    """
+
+    def __init__(self) -> None:
+        """
+        Initializes an empty set of task metrics.
+        """
+        self._lock = threading.Lock()
+        self._histograms: Dict[str, Dict[str, Histogram]] = {}
+        self._counters: Dict[str, Dict[str, int]] = {}
+        # Executions recorded so far, to tell whether anything changed.
+        self.recorded: int = 0
+
+    def _task(self, name: str) -> Dict[str, Histogram]:
+        """
+        Returns the histograms for a task name, creating them on first use.
+
+        Args:
+            name (str): The registered name of the task.
+
+        Returns:
+            Dict[str, Histogram]: Histograms keyed by measurement.
+        """
+        histograms = self._histograms.get(name)
+        if histograms is None:
+            with self._lock:
+                histograms = self._histograms.setdefault(name, {
+                    'queue_wait': Histogram(),
+                    'run_time': Histogram(),
+                    'context_overhead': Histogram(),
+                })
+                self._counters.setdefault(
+                    name, {'succeeded': 0, 'failed': 0, 'retried': 0})
+        return histograms
+
+    def record(self, name: str, queue_wait: Optional[float],
+               run_time: float, context_overhead: float,
+               outcome: str) -> None:
+        """
+        Records a single task execution.
+
+        Args:
+            name (str): The registered name of the task.
+            queue_wait (Optional[float]): Seconds between publishing and the
+            start of execution, or None if unknown.
+            run_time (float): Seconds spent inside the task body.
+            context_overhead (float): Seconds spent entering and leaving the
+            Flask application context.
+            outcome (str): One of 'succeeded', 'failed' or 'retried'.
+        """
+        histograms = self._task(name)
+        if queue_wait is not None:
+            histograms['queue_wait'].observe(queue_wait)
+        histograms['run_time'].observe(run_time)
+        histograms['context_overhead'].observe(context_overhead)
+        with self._lock:
+            self._counters[name][outcome] += 1
+            self.recorded += 1
+
+    def snapshot(self) -> Dict[str, Any]:
+        """
+        Returns a JSON-serializable view of all recorded task metrics.
+
+        Returns:
+            Dict[str, Any]: Counters and histogram snapshots keyed by task
+            name.
+        """
+        with self._lock:
+            names = list(self._histograms)
+            counters = {name: dict(self._counters[name]) for name in names}
+        return {
+            name: dict(
+                counters[name],
+                **{
+                    key: histogram.snapshot()
+                    for key, histogram in self._histograms[name].items()
+                }
+            )
+            for name in names
+        }
+
+    def merge(self, snapshot: Dict[str, Any]) -> None:
+        """
+        Adds the metrics of another snapshot, e.g. one recorded in a pool
+        child process.
+
+        Args:
+            snapshot (Dict[str, Any]): The result of `snapshot()`.
+        """
+        for name, stats in snapshot.items():
+            histograms = self._task(name)
+            for key, histogram in histograms.items():
+                histogram.merge(stats[key])
+            with self._lock:
+                counters = self._counters[name]
+                for outcome in counters:
+                    counters[outcome] += stats[outcome]
+
+    def dump(self, path: str) -> None:
+        """
+        Writes the current snapshot to a JSON file.
+
+        Args:
+            path (str): The file to write.
+        """
+        with open(path, 'w') as f:
+            json.dump(self.snapshot(), f, indent=2, sort_keys=True)
+
+
+@before_task_publish.connect(weak=False)
+def stamp_enqueue_time(headers: Optional[Dict[str, Any]] = None,
+                       **kwargs: Any) -> None:
+    """
+    Stamps outgoing task messages with the time they were published, so the
+    worker can measure how long they waited in the queue.
+
+    Args:
+        headers (Optional[Dict[str, Any]]): The message headers to update.
+        **kwargs (Any): Remaining signal arguments.
+    """
+    if headers is not None:
+        headers.setdefault(ENQUEUED_AT_HEADER, time.time())
+
+
+def metrics_key(main_pid: int) -> str:
+    """
+    Returns the Redis hash where the pool children of a worker publish their
+    task metrics, one field per child process id.
+
+    Args:
+        main_pid (int): Process id of the worker's main process.
+
+    Returns:
+        str: The key of the hash.
+    """
+    return f'{METRICS_KEY_PREFIX}:{socket.gethostname()}:{main_pid}'
 
 
 def make_celery(app: Flask) -> Celery:
     """
-    Create and configure a Celery object with Flask application context and
-    custom logging.
+    Create and configure a Celery object with Flask application context,
+    custom logging and per-task instrumentation.
+
+    The collected TaskMetrics are available as ``celery.Task.metrics``, can be
+    queried from a running worker with ``celery inspect task_metrics`` and are
+    written to ``TASK_METRICS_DUMP_PATH`` (if configured) on worker shutdown.
+    Tasks of the prefork pool run in child processes, which publish their
+    metrics to the Redis result backend periodically and on exit; the main
+    process adds them up when queried and on shutdown.
 
     Args:
         app (Flask): The Flask application instance to integrate with Celery.
@@ -36,10 +214,90 @@ def make_celery(app: Flask) -> Celery:
         handler.setFormatter(formatter)
         logger.addHandler(handler)
 
+    task_metrics = TaskMetrics()
+
+    def metrics_client() -> Optional[redis.Redis]:
+        """
+        Returns the Redis client of the result backend.
+
+        Returns:
+            Optional[redis.Redis]: The client, or None if the result backend
+            is not Redis, in which case pool children cannot share metrics.
+        """
+        if isinstance(celery.backend, RedisBackend):
+            return celery.backend.client
+        return None
+
+    def publish_task_metrics() -> None:
+        """
+        Publishes the metrics of this pool child process for the worker's
+        main process. Failures are only logged, as metrics must never get in
+        the way of the tasks.
+        """
+        client = metrics_client()
+        if client is None:
+            return
+        key = metrics_key(os.getppid())
+        try:
+            client.hset(key, str(os.getpid()),
+                        json.dumps(task_metrics.snapshot()))
+            client.expire(key, METRICS_KEY_TTL)
+        except Exception as e:
+            logging.warning(f'Could not publish task metrics: {e}')
+
+    def publish_task_metrics_periodically() -> None:
+        """
+        Publishes this pool child's metrics every METRICS_PUBLISH_INTERVAL
+        seconds whenever tasks were recorded since the last publication.
+        """
+        published: int = 0
+        while True:
+            time.sleep(METRICS_PUBLISH_INTERVAL)
+            recorded: int = task_metrics.recorded
+            if recorded != published:
+                publish_task_metrics()
+                published = recorded
+
+    def collect_task_metrics() -> TaskMetrics:
+        """
+        Adds up the metrics recorded in this process and those published by
+        its pool children.
+
+        Returns:
+            TaskMetrics: The combined metrics.
+        """
+        combined = TaskMetrics()
+        combined.merge(task_metrics.snapshot())
+        client = metrics_client()
+        if client is not None:
+            try:
+                for published in client.hvals(metrics_key(os.getpid())):
+                    combined.merge(json.loads(published))
+            except redis.RedisError as e:
+                logging.warning(f'Could not collect task metrics: {e}')
+        return combined
+
+    def clear_published_metrics() -> None:
+        """
+        Deletes the metrics published by this worker's pool children.
+        """
+        client = metrics_client()
+        if client is None:
+            return
+        try:
+            client.delete(metrics_key(os.getpid()))
+        except redis.RedisError as e:
+            logging.warning(f'Could not clear task metrics: {e}')
+
     class ContextTask(celery.Task):
         """
-        A Celery Task that runs within the Flask application context.
+        A Celery Task that runs within the Flask application context and
+        records its queue wait, run time and context overhead.
         """
+        metrics: TaskMetrics = task_metrics
+        # Set in prefork pool children, whose metrics the main process can
+        # only see once published.
+        publish_metrics: bool = False
 
         def __call__(self, *args: Any, **kwargs: Any) -> Any:
             """
@@ -52,8 +310,99 @@ def make_celery(app: Flask) -> Celery:
             Returns:
                 Any: The result of the task execution.
             """
-            with app.app_context():
-                return self.run(*args, **kwargs)
+            start: float = time.perf_counter()
+            queue_wait: Optional[float] = None
+            enqueued_at = getattr(self.request, ENQUEUED_AT_HEADER, None)
+            # Tasks scheduled with an ETA wait on purpose; only measure
+            # the queue wait of tasks meant to run immediately.
+            if enqueued_at is not None and self.request.eta is None:
+                queue_wait = max(time.time() - float(enqueued_at), 0.0)
+            outcome: str = 'failed'
+            run_start: float = start
+            run_end: float = start
+            try:
+                with app.app_context():
+                    run_start = time.perf_counter()
+                    try:
+                        result = self.run(*args, **kwargs)
+                        outcome = 'succeeded'
+                        return result
+                    except Retry:
+                        outcome = 'retried'
+                        raise
+                    finally:
+                        run_end = time.perf_counter()
+            finally:
+                run_time = run_end - run_start
+                self.metrics.record(
+                    self.name,
+                    queue_wait=queue_wait,
+                    run_time=run_time,
+                    context_overhead=time.perf_counter() - start - run_time,
+                    outcome=outcome
+                )
 
     celery.Task = ContextTask
+
+    @worker_init.connect(weak=False)
+    def clear_task_metrics(**kwargs: Any) -> None:
+        """
+        Drops metrics left by an earlier worker that had the same process id.
+
+        Args:
+            **kwargs (Any): Signal arguments.
+        """
+        clear_published_metrics()
+
+    @worker_process_init.connect(weak=False)
+    def enable_metrics_publishing(**kwargs: Any) -> None:
+        """
+        Makes a new pool child publish its metrics periodically.
+
+        Args:
+            **kwargs (Any): Signal arguments.
+        """
+        ContextTask.publish_metrics = True
+        threading.Thread(target=publish_task_metrics_periodically,
+                         name='task-metrics', daemon=True).start()
+
+    @worker_process_shutdown.connect(weak=False)
+    def flush_task_metrics(**kwargs: Any) -> None:
+        """
+        Publishes a pool child's final metrics before it exits.
+
+        Args:
+            **kwargs (Any): Signal arguments.
+        """
+        if ContextTask.publish_metrics:
+            publish_task_metrics()
+
+    @inspect_command(name='task_metrics')
+    def dump_task_metrics(state: Any, **kwargs: Any) -> Dict[str, Any]:
+        """Return per-task queue wait, run time and failure histograms."""
+        return collect_task_metrics().snapshot()
+
+    @worker_shutdown.connect(weak=False)
+    def write_task_metrics(**kwargs: Any) -> None:
+        """
+        Logs the collected task metrics and writes them to
+        TASK_METRICS_DUMP_PATH when the worker shuts down.
+
+        Args:
+            **kwargs (Any): Signal arguments.
+        """
+        combined = collect_task_metrics()
+        for name, stats in combined.snapshot().items():
+            logging.info(
+                f"{name}: {stats['succeeded']} succeeded, "
+                f"{stats['failed']} failed, {stats['retried']} retried, "
+                f"queue wait p50={stats['queue_wait']['p50']} "
+                f"p99={stats['queue_wait']['p99']}, "
+                f"run time p50={stats['run_time']['p50']} "
+                f"p99={stats['run_time']['p99']}")
+        dump_path: Optional[str] = app.config.get('TASK_METRICS_DUMP_PATH')
+        if dump_path:
+            combined.dump(dump_path)
+        clear_published_metrics()
+
     return celery
@@ -1,4 +1,9 @@
 # config.py is a module that defines configuration classes for the application.
+import functools
+import os
+from typing import Dict, List, Type
+
+
 class BaseConfig:
     """
     A class representing the base configuration for the application.
@@ -7,9 +12,71 @@ class BaseConfig:
         REQUEST_TIMEOUT (int): Default request timeout in seconds.
         Used to define how long the application waits for a response.
         LONGPOLL_TIMEOUT (int): Default long poll timeout in seconds.
+        LONGPOLL_MAX_CHANNELS (int): Largest number of notification
+        channels one long poll may wait on.
+        CORS_ALLOWED_ORIGINS (List[str]): Origins allowed to make credentialed
+        cross-origin requests, from a comma-separated environment variable.
+        CORS_MAX_AGE (int): How long, in seconds, browsers may cache a
+        preflight response. Browsers cap this (Chromium at 7200 seconds).
+        POSTS_STORE (str): Backend of the posts store, 'memory' or 'sqlite'.
+        POSTS_DB_PATH (str): Database file used by the 'sqlite' posts store.
+        POSTS_PAGE_SIZE (int): Number of posts returned when no limit is
+        requested.
+        POSTS_MAX_PAGE_SIZE (int): Largest number of posts a client may
+        request in one page.
+        STRIPE_API_BASE (str): Base URL of the Stripe API, overridable to
+        point the services at a local stub.
+        GITHUB_API_BASE (str): Base URL of the GitHub API, overridable to
+        point the services at a local stub.
+        STATS_LOG_INTERVAL (int): Seconds between logged connection
+        statistics summaries, or 0 to disable them.
+        JSON_COMPRESS_MIN_SIZE (int): Smallest JSON response body, in bytes,
+        that is compressed for clients accepting gzip or brotli, or 0 to
+        disable compression.
+        JSON_COMPRESS_LEVEL (int): gzip level (and brotli quality) used to
+        compress JSON responses.
+        REDIS_URL (str): The Redis server shared by the services.
+        RATELIMIT_STORAGE (str): Where rate limit buckets are kept, 'memory'
+        (per process) or 'redis' (shared by all workers).
+        RATELIMIT_RATE (float): Requests per second each client may make to
+        a rate-limited endpoint, or 0 to disable rate limiting.
+        RATELIMIT_BURST (int): Requests a client may make at once before
+        being held to RATELIMIT_RATE.
+        RATELIMIT_MAX_CONCURRENT (int): Requests each process serves at once
+        across its rate-limited endpoints before shedding load, or 0 for no
+        limit.
+        TASKS_MAX_OUTSTANDING (int): Celery tasks an endpoint may have queued
+        or running at once, across all processes, before shedding load, or 0
+        for no limit.
+        TASKS_OUTSTANDING_TIMEOUT (int): Seconds after which a queued task is
+        no longer counted, in case its worker died without reporting it.
     """
     REQUEST_TIMEOUT: int = 3
     LONGPOLL_TIMEOUT: int = 30
+    LONGPOLL_MAX_CHANNELS: int = 16
+    CORS_ALLOWED_ORIGINS: List[str] = os.getenv(
+        'CORS_ALLOWED_ORIGINS', 'http://localhost:3000').split(',')
+    CORS_MAX_AGE: int = int(os.getenv('CORS_MAX_AGE', '7200'))
+    POSTS_STORE: str = os.getenv('POSTS_STORE', 'memory')
+    POSTS_DB_PATH: str = os.getenv('POSTS_DB_PATH', 'posts.db')
+    POSTS_PAGE_SIZE: int = 100
+    POSTS_MAX_PAGE_SIZE: int = 1000
+    STRIPE_API_BASE: str = os.getenv('STRIPE_API_BASE',
+                                     'https://api.stripe.com')
+    GITHUB_API_BASE: str = os.getenv('GITHUB_API_BASE',
+                                     'https://api.github.com')
+    STATS_LOG_INTERVAL: int = int(os.getenv('STATS_LOG_INTERVAL', '60'))
+    JSON_COMPRESS_MIN_SIZE: int = int(
+        os.getenv('JSON_COMPRESS_MIN_SIZE', '1024'))
+    JSON_COMPRESS_LEVEL: int = 6
+    REDIS_URL: str = os.getenv('REDIS_URL', 'redis://localhost:6379/0')
+    RATELIMIT_STORAGE: str = os.getenv('RATELIMIT_STORAGE', 'memory')
+    RATELIMIT_RATE: float = float(os.getenv('RATELIMIT_RATE', '2'))
+    RATELIMIT_BURST: int = int(os.getenv('RATELIMIT_BURST', '10'))
+    RATELIMIT_MAX_CONCURRENT: int = int(
+        os.getenv('RATELIMIT_MAX_CONCURRENT', '8'))
+    TASKS_MAX_OUTSTANDING: int = int(os.getenv('TASKS_MAX_OUTSTANDING', '20'))
+    TASKS_OUTSTANDING_TIMEOUT: int = 600
 
 
 class ProdConfig(BaseConfig):
@@ -38,3 +105,24 @@ class TestConfig(BaseConfig):
     """
     REQUEST_TIMEOUT: int = 5
     # LONGPOLL_TIMEOUT is inherited from BaseConfig
+
+
+CONFIGS: Dict[str, Type[BaseConfig]] = {
+    'production': ProdConfig,
+    'testing': TestConfig,
+}
+
+
+@functools.lru_cache(maxsize=None)
+def get_config() -> Type[BaseConfig]:
+    """
+    Determine the configuration class for the current environment.
+
+    The FLASK_ENV environment variable is read once per process, so every
+    application (and the gateway mounting them) shares the same choice.
+
+    Returns:
+        Type[BaseConfig]: ProdConfig for 'production', TestConfig for
+        'testing', otherwise BaseConfig.
+    """
+    return CONFIGS.get(os.getenv('FLASK_ENV', ''), BaseConfig)
@@ -1,14 +1,47 @@
-from flask import Flask, Response, Request, abort, jsonify, request
-from typing import Dict
+from flask import Flask, Response, Request, abort, request, url_for
+import hashlib
+import os
+from config import get_config
+from instrumentation import init_instrumentation
+from json_provider import choose_encoding, compress, encode_json, init_json
+from json_provider import set_encoded_body
+from posts_store import Post, PostsStore, make_posts_store
+from typing import Dict, List, Optional, Tuple
+from werkzeug.security import safe_join
 
 app = Flask(__name__, static_url_path='', static_folder='static')
 
-POSTS: Dict[str, Dict[str, str]] = {
+# Load the configuration for the current environment
+app.config.from_object(get_config())
+
+# Encode JSON with the fast provider and compress large responses
+init_json(app)
+
+# Track connection lifetimes and expose them at /_stats
+init_instrumentation(app)
+
+HeaderList = List[Tuple[str, str]]
+
+CORS_ALLOW_METHODS: str = 'GET, DELETE'
+CORS_ALLOW_HEADERS: str = 'Timezone-Offset, Sample-Source'
+CORS_EXPOSE_HEADERS: str = 'X-Powered-By, Link'
+
+POSTS: Dict[str, Post] = {
     '1': {'post': 'This is the first blog post.'},
     '2': {'post': 'This is the second blog post.'},
     '3': {'post': 'This is the third blog post.'}
 }
 
+# The store behind the posts endpoints, seeded with POSTS when it is new.
+posts_store: PostsStore = make_posts_store(app.config, POSTS)
+
+# Serialized pages keyed by (after, limit): the store version they were
+# built from, the body, the next-page cursor, the ETag and the compressed
+# bodies built so far, keyed by content encoding.
+PageCacheEntry = Tuple[int, bytes, Optional[str], str, Dict[str, bytes]]
+_page_cache: Dict[Tuple[Optional[str], int], PageCacheEntry] = {}
+PAGE_CACHE_SIZE: int = 256
+
 
 def is_preflight(request: Request) -> bool:
     """
@@ -29,11 +62,104 @@ def is_preflight(request: Request) -> bool:
     return is_http_options and has_origin_header and has_request_method
 
 
+def has_resource(request: Request) -> bool:
+    """
+    Determine if the request's URL names an existing resource. The static
+    files are served from the root, so their rule matches any path and the
+    file itself must exist.
+
+    Args:
+        request (Request): The Flask request object, after routing.
+
+    Returns:
+        bool: True if a view or static file serves the URL, otherwise False.
+    """
+    if request.url_rule is None:
+        return False
+    if request.endpoint == 'static' and app.static_folder is not None:
+        path = safe_join(app.static_folder, request.view_args['filename'])
+        return path is not None and os.path.isfile(path)
+    return True
+
+
+def build_cors_headers(origins: List[str],
+                       max_age: int) -> Tuple[Dict[str, HeaderList],
+                                              Dict[str, HeaderList]]:
+    """
+    Precompute the CORS header blocks for every allowed origin, so that
+    requests only need a dictionary lookup on their Origin header.
+
+    Args:
+        origins (List[str]): The origins allowed to make cross-origin
+        requests.
+        max_age (int): How long browsers may cache a preflight response.
+
+    Returns:
+        Tuple[Dict[str, HeaderList], Dict[str, HeaderList]]: The headers for
+        actual responses and for preflight responses, keyed by origin.
+    """
+    response_headers: Dict[str, HeaderList] = {}
+    preflight_headers: Dict[str, HeaderList] = {}
+    for origin in origins:
+        origin = origin.strip()
+        if not origin:
+            continue
+        common: HeaderList = [
+            ('Access-Control-Allow-Origin', origin),
+            ('Access-Control-Allow-Credentials', 'true'),
+            ('X-Powered-By', 'Flask'),
+            # Settings the Vary header to 'Origin' ensures that the servers's
+            # CORS policy is espected by the caches, preventing them from
+            # incorrectly delivering cached responses to different origins,
+            # which could potentially expose sensitive data or
+            # violate security policies.
+            ('Vary', 'Origin'),
+        ]
+        response_headers[origin] = common + [
+            ('Access-Control-Expose-Headers', CORS_EXPOSE_HEADERS),
+        ]
+        preflight_headers[origin] = common + [
+            ('Access-Control-Max-Age', str(max_age)),
+            ('Access-Control-Allow-Methods', CORS_ALLOW_METHODS),
+            ('Access-Control-Allow-Headers', CORS_ALLOW_HEADERS),
+        ]
+    return response_headers, preflight_headers
+
+
+CORS_RESPONSE_HEADERS, CORS_PREFLIGHT_HEADERS = build_cors_headers(
+    app.config['CORS_ALLOWED_ORIGINS'], app.config['CORS_MAX_AGE'])
+
+# Headers for responses to requests without an allowed origin.
+NON_CORS_HEADERS: HeaderList = [('X-Powered-By', 'Flask'), ('Vary', 'Origin')]
+
+
+@app.before_request
+def handle_preflight() -> Optional[Response]:
+    """
+    Answer CORS preflight requests from allowed origins for existing routes
+    before the request is dispatched to a view. Preflights for unknown URLs
+    are answered with 404 Not Found.
+
+    Returns:
+        Optional[Response]: An empty 204 response carrying the precomputed
+        preflight headers, or None to continue normal request handling.
+    """
+    if not is_preflight(request):
+        return None
+    if not has_resource(request):
+        abort(404)
+    headers = CORS_PREFLIGHT_HEADERS.get(request.headers['Origin'])
+    if headers is None:
+        return None
+    return Response(status=204, headers=headers)
+
+
 @app.after_request
 def handle_cors(response: Response) -> Response:
     """
-    Modify the response to include CORS headers and handle preflight requests
-    appropriately.
+    Add the precomputed CORS headers for the request's origin to the
+    response. Preflight responses built by handle_preflight already carry
+    their headers and are returned untouched.
 
     Args:
         response (Response): The Flask response object to be modified.
@@ -41,35 +167,93 @@ def handle_cors(response: Response) -> Response:
     Returns:
         Response: The modified response object with added CORS headers.
     """
-    response.headers['Access-Control-Allow-Origin'] = 'http://localhost:3000'
-    response.headers['Access-Control-Allow-Credentials'] = 'true'
-    response.headers['Access-Control-Expose-Headers'] = 'X-Powered-By'
-    response.headers['Access-Control-Max-Age'] = '120'
-    response.headers['Access-Control-Allow-Methods'] = 'GET, DELETE'
-    response.headers['Access-Control-Allow-Headers'] = (
-        'Timezone-Offset, Sample-Source'
-    )
-    response.headers['X-Powered-By'] = 'Flask'
-    # Settings the Vary header to 'Origin' ensures that the servers's CORS
-    # policy is espected by the caches, preventing them from incorrectly
-    # delivering cached responses to different origins,
-    # which could potentially expose sensitive data or
-    # violate security policies.
-    response.headers['Vary'] = 'Origin'
-    if is_preflight(request):
-        response.status_code = 204
+    origin: Optional[str] = request.headers.get('Origin')
+    if origin is not None and origin in CORS_PREFLIGHT_HEADERS \
+            and is_preflight(request):
+        return response
+    response.headers.extend(
+        CORS_RESPONSE_HEADERS.get(origin or '', NON_CORS_HEADERS))
     return response
 
 
+def posts_page(after: Optional[str],
+               limit: int) -> Tuple[bytes, Optional[str], str,
+                                    Dict[str, bytes]]:
+    """
+    Return one serialized page of posts, its next-page cursor and its ETag,
+    reading and serializing the page only if the store has changed since it
+    was last built.
+
+    The ETag is derived from the body and cursor rather than the version
+    alone, so it stays valid across restarts and between worker processes.
+
+    Args:
+        after (Optional[str]): The cursor the page starts after.
+        limit (int): The maximum number of posts on the page.
+
+    Returns:
+        Tuple[bytes, Optional[str], str, Dict[str, bytes]]: The JSON body,
+        the cursor of the next page (or None), the ETag, and the compressed
+        bodies built so far keyed by content encoding, which callers may
+        add to.
+    """
+    version = posts_store.version()
+    key = (after, limit)
+    entry = _page_cache.get(key)
+    if entry is None or entry[0] != version:
+        posts, next_cursor = posts_store.list(after, limit)
+        body = encode_json(app, posts) + b'\n'
+        digest = hashlib.sha1(body)
+        digest.update((next_cursor or '').encode())
+        entry = (version, body, next_cursor, digest.hexdigest(), {})
+        if len(_page_cache) >= PAGE_CACHE_SIZE:
+            _page_cache.clear()
+        _page_cache[key] = entry
+    return entry[1], entry[2], entry[3], entry[4]
+
+
 @app.route('/api/posts', methods=['GET'])
 def get_posts() -> Response:
     """
-    Retrieve all blog posts and return them as a JSON response.
+    Retrieve a page of blog posts and return them as a JSON response.
+
+    The page is selected with the optional `after` cursor and `limit` query
+    parameters. When more posts follow, a `Link` header with rel="next"
+    points at the next page. Conditional requests whose If-None-Match
+    matches the current ETag are answered with 304 Not Modified and no body.
+    Large pages are sent compressed when the client accepts it, compressing
+    each page once per encoding rather than on every request.
 
     Returns:
-        Response: A JSON response containing all blog posts.
+        Response: A JSON response containing a page of blog posts, or a 304.
     """
-    return jsonify(POSTS)
+    after: Optional[str] = request.args.get('after')
+    try:
+        limit: int = int(request.args.get(
+            'limit', app.config['POSTS_PAGE_SIZE']))
+    except ValueError:
+        abort(400)
+    limit = max(1, min(limit, app.config['POSTS_MAX_PAGE_SIZE']))
+
+    body, next_cursor, etag, compressed = posts_page(after, limit)
+    encoding: Optional[str] = choose_encoding(app, len(body))
+    if request.if_none_match.contains_weak(etag):
+        response = Response(status=304)
+        response.set_etag(etag, weak=encoding is not None)
+        response.vary.add('Accept-Encoding')
+    else:
+        response = Response(mimetype='application/json')
+        response.set_etag(etag)
+        data: bytes = body
+        if encoding is not None:
+            if encoding not in compressed:
+                compressed[encoding] = compress(app, body, encoding)
+            data = compressed[encoding]
+        set_encoded_body(response, data, encoding)
+    if next_cursor is not None:
+        next_url = url_for('get_posts', after=next_cursor, limit=limit)
+        response.headers['Link'] = f'<{next_url}>; rel="next"'
+    return response
 
 
 @app.route('/api/posts/<post_id>', methods=['DELETE'])
@@ -85,8 +269,7 @@ def delete_post(post_id: str) -> Response:
                   (success, not found, or forbidden).
     """
     if request.cookies.get('username') == 'owner':
-        if post_id in POSTS:
-            del POSTS[post_id]
+        if posts_store.delete(post_id):
             return Response(status=204)
         else:
             abort(404)
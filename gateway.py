@@ -0,0 +1,117 @@
+"""
+gateway.py: A single-process entry point that mounts several services under
+URL prefixes.
+
+Each service module is only imported, and its Flask app only built, when the
+first request for its prefix arrives, so unused services never pay for their
+imports (stripe, celery, flask_socketio, ...). The services to mount are
+selected with the GATEWAY_SERVICES environment variable, a comma-separated
+list of service names that defaults to all of them.
+"""
+
+import importlib
+import os
+import threading
+from flask import Flask, Response, jsonify
+from werkzeug.middleware.dispatcher import DispatcherMiddleware
+from config import get_config
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+WSGIApp = Callable[[Dict[str, Any], Callable[..., Any]], Iterable[bytes]]
+
+# Service name -> URL prefix it is mounted under.
+SERVICES: Dict[str, str] = {
+    'sync': '/sync',
+    'webhook': '/webhook',
+    'longpoll': '/longpoll',
+    'sse': '/sse',
+    'corsapp': '/cors',
+    'websockets': '/websockets',
+    'taskapp': '/tasks',
+}
+
+
+class LazyApp:
+    """
+    A WSGI application that imports a service module on its first request
+    and then forwards every request to the module's Flask app.
+
+    Attributes:
+        module (str): Name of the module defining the service's `app`.
+        app (Optional[WSGIApp]): The loaded application, or None until the
+        first request.
+    """
+
+    def __init__(self, module: str) -> None:
+        """
+        Initializes the wrapper without importing the module.
+
+        Parameters:
+            module (str): Name of the module defining the service's `app`.
+        """
+        self.module: str = module
+        self.app: Optional[WSGIApp] = None
+        self._lock = threading.Lock()
+
+    def load(self) -> WSGIApp:
+        """
+        Imports the module and returns its app, exactly once even when
+        several requests arrive at the same time.
+
+        Returns:
+            WSGIApp: The service's WSGI application.
+        """
+        if self.app is None:
+            with self._lock:
+                if self.app is None:
+                    self.app = importlib.import_module(self.module).app
+        return self.app
+
+    def __call__(self, environ: Dict[str, Any],
+                 start_response: Callable[..., Any]) -> Iterable[bytes]:
+        return self.load()(environ, start_response)
+
+
+def selected_services() -> List[str]:
+    """
+    Determine which services to mount from GATEWAY_SERVICES.
+
+    Returns:
+        List[str]: The selected service names.
+
+    Raises:
+        ValueError: If an unknown service name is selected.
+    """
+    selected: str = os.getenv('GATEWAY_SERVICES', ','.join(SERVICES))
+    names = [name.strip() for name in selected.split(',') if name.strip()]
+    unknown = [name for name in names if name not in SERVICES]
+    if unknown:
+        raise ValueError(f'Unknown services: {", ".join(unknown)}')
+    return names
+
+
+app: Flask = Flask(__name__)
+app.config.from_object(get_config())
+
+mounts: Dict[str, LazyApp] = {
+    SERVICES[name]: LazyApp(name) for name in selected_services()
+}
+app.wsgi_app = DispatcherMiddleware(app.wsgi_app, mounts)  # type: ignore
+
+
+@app.route('/')
+def index() -> Response:
+    """
+    Lists the mounted services and whether they have been loaded yet.
+
+    Returns:
+        Response: JSON mapping each URL prefix to its module and load state.
+    """
+    return jsonify({
+        prefix: {'service': lazy.module, 'loaded': lazy.app is not None}
+        for prefix, lazy in mounts.items()
+    })
+
+
+if __name__ == '__main__':
+    app.run()
@@ -0,0 +1,319 @@
+# instrumentation.py is a module that measures how long requests hold their
+# connections, shared by all the Flask applications.
+import logging
+import threading
+import time
+from flask import Flask, Response, jsonify, request
+from metrics import Histogram
+from typing import Any, Callable, Dict, Iterable, Iterator, Optional
+
+WSGIApp = Callable[[Dict[str, Any], Callable[..., Any]], Iterable[bytes]]
+
+# Label for requests that do not match any route of the application.
+UNMATCHED: str = '<unmatched>'
+
+# WSGI environ key where the request hook leaves the EndpointStats of the
+# endpoint Flask routed the request to.
+ENDPOINT_STATS_KEY: str = 'instrumentation.endpoint_stats'
+
+
+class EndpointStats:
+    """
+    Connection statistics for a single endpoint.
+
+    Attributes:
+        active (int): Requests currently holding a connection.
+        peak_active (int): Highest number of simultaneously active requests.
+        total (int): Requests completed.
+        bytes_sent (int): Response body bytes streamed to clients.
+        hold_time (Histogram): Seconds from the start of a request until its
+        response was fully sent.
+        time_to_first_byte (Histogram): Seconds from the start of a request
+        until the first body chunk was produced.
+    """
+
+    def __init__(self) -> None:
+        """
+        Initializes empty statistics.
+        """
+        self.active: int = 0
+        self.peak_active: int = 0
+        self.total: int = 0
+        self.bytes_sent: int = 0
+        self.hold_time: Histogram = Histogram()
+        self.time_to_first_byte: Histogram = Histogram()
+
+    def snapshot(self) -> Dict[str, Any]:
+        """
+        Returns a JSON-serializable view of the statistics.
+
+        Returns:
+            Dict[str, Any]: Counters and histogram snapshots.
+        """
+        return {
+            'active': self.active,
+            'peak_active': self.peak_active,
+            'total': self.total,
+            'bytes_sent': self.bytes_sent,
+            'hold_time': self.hold_time.snapshot(),
+            'time_to_first_byte': self.time_to_first_byte.snapshot(),
+        }
+
+
+class ConnectionStats:
+    """
+    Connection statistics of an application, keyed by endpoint name.
+    """
+
+    def __init__(self) -> None:
+        """
+        Initializes an empty set of statistics.
+        """
+        self.lock = threading.Lock()
+        self.endpoints: Dict[str, EndpointStats] = {}
+
+    def started(self, endpoint: str) -> EndpointStats:
+        """
+        Counts a request as active on an endpoint.
+
+        Args:
+            endpoint (str): The endpoint name.
+
+        Returns:
+            EndpointStats: The endpoint's statistics.
+        """
+        with self.lock:
+            stats = self.endpoints.get(endpoint)
+            if stats is None:
+                stats = self.endpoints[endpoint] = EndpointStats()
+            stats.active += 1
+            stats.peak_active = max(stats.peak_active, stats.active)
+        return stats
+
+    def finished(self, stats: EndpointStats, hold_time: float,
+                 ttfb: Optional[float], bytes_sent: int) -> None:
+        """
+        Records the end of a request.
+
+        Args:
+            stats (EndpointStats): The endpoint's statistics.
+            hold_time (float): Seconds the request held its connection.
+            ttfb (Optional[float]): Seconds until the first body chunk, or
+            None if the body was empty.
+            bytes_sent (int): Response body bytes sent.
+        """
+        with self.lock:
+            stats.active -= 1
+            stats.total += 1
+            stats.bytes_sent += bytes_sent
+        stats.hold_time.observe(hold_time)
+        if ttfb is not None:
+            stats.time_to_first_byte.observe(ttfb)
+
+    def snapshot(self) -> Dict[str, Any]:
+        """
+        Returns a JSON-serializable view of all endpoints.
+
+        Returns:
+            Dict[str, Any]: Endpoint statistics keyed by endpoint name.
+        """
+        with self.lock:
+            endpoints = dict(self.endpoints)
+        return {name: stats.snapshot() for name, stats in endpoints.items()}
+
+    def log_summary(self, logger: logging.Logger) -> None:
+        """
+        Logs one line per endpoint with its current statistics.
+
+        Args:
+            logger (logging.Logger): The logger to write to.
+        """
+        for name, stats in self.snapshot().items():
+            hold = stats['hold_time']
+            ttfb = stats['time_to_first_byte']
+            logger.info(
+                f"{name}: active={stats['active']} "
+                f"peak={stats['peak_active']} total={stats['total']} "
+                f"hold p50={hold['p50']} p99={hold['p99']} "
+                f"ttfb p50={ttfb['p50']} p99={ttfb['p99']} "
+                f"bytes={stats['bytes_sent']}")
+
+
+class InstrumentedBody:
+    """
+    Wraps a WSGI response body to measure time to first byte, bytes sent and
+    the moment the server finishes sending it.
+    """
+
+    def __init__(self, body: Iterable[bytes], stats: ConnectionStats,
+                 endpoint: EndpointStats, start: float) -> None:
+        """
+        Initializes the wrapper.
+
+        Parameters:
+            body (Iterable[bytes]): The application's response body.
+            stats (ConnectionStats): The application's statistics.
+            endpoint (EndpointStats): The statistics of the request's
+            endpoint.
+            start (float): When the request started, from
+            time.perf_counter().
+        """
+        self.body = body
+        self.stats = stats
+        self.endpoint = endpoint
+        self.start = start
+        self.ttfb: Optional[float] = None
+        self.bytes_sent: int = 0
+        self.closed: bool = False
+
+    def __iter__(self) -> Iterator[bytes]:
+        for chunk in self.body:
+            if self.ttfb is None and chunk:
+                self.ttfb = time.perf_counter() - self.start
+            self.bytes_sent += len(chunk)
+            yield chunk
+
+    def close(self) -> None:
+        """
+        Closes the wrapped body and records the finished request.
+        """
+        if self.closed:
+            return
+        self.closed = True
+        try:
+            close = getattr(self.body, 'close', None)
+            if close is not None:
+                close()
+        finally:
+            self.stats.finished(self.endpoint,
+                                time.perf_counter() - self.start,
+                                self.ttfb, self.bytes_sent)
+
+
+class InstrumentationMiddleware:
+    """
+    WSGI middleware that tracks active connections, hold times, time to
+    first byte and bytes streamed for each endpoint of a Flask application.
+
+    The endpoint is taken from Flask's own routing by a request hook, so
+    requests are not matched against the URL map a second time.
+    """
+
+    def __init__(self, app: Flask, wsgi_app: WSGIApp,
+                 stats: ConnectionStats, log_interval: float) -> None:
+        """
+        Initializes the middleware.
+
+        Parameters:
+            app (Flask): The application whose logger receives the
+            summaries.
+            wsgi_app (WSGIApp): The WSGI application to wrap.
+            stats (ConnectionStats): Where to record the statistics.
+            log_interval (float): Seconds between logged summaries, or 0 to
+            disable them.
+        """
+        self.app = app
+        self.wsgi_app = wsgi_app
+        self.stats = stats
+        self.log_interval = log_interval
+        self._logger_lock = threading.Lock()
+        self._logger_started: bool = False
+
+    def endpoint_stats(self, environ: Dict[str, Any]) -> EndpointStats:
+        """
+        Returns the statistics of the endpoint a request was routed to.
+
+        Requests that never reached Flask's request hooks, such as those
+        answered by the Socket.IO middleware, are counted as started now
+        under a fixed label.
+
+        Args:
+            environ (Dict[str, Any]): The WSGI environment.
+
+        Returns:
+            EndpointStats: The endpoint's statistics.
+        """
+        stats: Optional[EndpointStats] = environ.get(ENDPOINT_STATS_KEY)
+        if stats is None:
+            if environ.get('PATH_INFO', '').startswith('/socket.io/'):
+                stats = self.stats.started('socket.io')
+            else:
+                stats = self.stats.started(UNMATCHED)
+            environ[ENDPOINT_STATS_KEY] = stats
+        return stats
+
+    def start_logger(self) -> None:
+        """
+        Starts the thread logging periodic summaries, once per process.
+        """
+        if self._logger_started or not self.log_interval:
+            return
+        with self._logger_lock:
+            if self._logger_started:
+                return
+            self._logger_started = True
+
+        def run() -> None:
+            while True:
+                time.sleep(self.log_interval)
+                self.stats.log_summary(self.app.logger)
+
+        threading.Thread(target=run, name='stats-logger', daemon=True).start()
+
+    def __call__(self, environ: Dict[str, Any],
+                 start_response: Callable[..., Any]) -> Iterable[bytes]:
+        start = time.perf_counter()
+        self.start_logger()
+        try:
+            body = self.wsgi_app(environ, start_response)
+        except BaseException:
+            self.stats.finished(self.endpoint_stats(environ),
+                                time.perf_counter() - start, None, 0)
+            raise
+        return InstrumentedBody(body, self.stats,
+                                self.endpoint_stats(environ), start)
+
+
+def init_instrumentation(app: Flask) -> ConnectionStats:
+    """
+    Instrument a Flask application's connections and expose the statistics
+    at `/_stats`.
+
+    The STATS_LOG_INTERVAL configuration value sets the number of seconds
+    between logged summaries (0 disables them).
+
+    Args:
+        app (Flask): The application to instrument.
+
+    Returns:
+        ConnectionStats: The statistics being collected.
+    """
+    stats = ConnectionStats()
+    log_interval: float = app.config.get('STATS_LOG_INTERVAL', 0)
+    if log_interval and app.logger.level == logging.NOTSET:
+        app.logger.setLevel(logging.INFO)
+    app.wsgi_app = InstrumentationMiddleware(  # type: ignore
+        app, app.wsgi_app, stats, log_interval)
+
+    def count_request() -> None:
+        """
+        Counts the request as active on the endpoint Flask routed it to.
+        """
+        request.environ[ENDPOINT_STATS_KEY] = stats.started(
+            request.endpoint or UNMATCHED)
+
+    # Run before every other hook, including ones that answer the request
+    # themselves, such as corsapp's preflight handler.
+    app.before_request_funcs.setdefault(None, []).insert(0, count_request)
+
+    @app.route('/_stats')
+    def connection_stats() -> Response:
+        """
+        Returns the connection statistics of every endpoint.
+
+        Returns:
+            Response: JSON statistics keyed by endpoint name.
+        """
+        return jsonify(stats.snapshot())
+
+    return stats
@@ -0,0 +1,235 @@
+# json_provider.py is a module that defines the JSON encoding and response
+# compression shared by all the Flask applications and Socket.IO servers.
+import gzip
+import json
+from flask import Flask, Response, request
+from flask.json.provider import DefaultJSONProvider
+from typing import Any, List, Optional
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# Encodings the server can produce, in order of preference.
+ENCODINGS: List[str] = ['br', 'gzip'] if brotli is not None else ['gzip']
+
+
+class FastJSONProvider(DefaultJSONProvider):
+    """
+    A JSON provider that encodes with orjson when it is installed and falls
+    back to the standard library otherwise.
+
+    Values orjson cannot encode, and datetimes and dataclasses, are handed
+    to Flask's default handler so the output matches DefaultJSONProvider.
+    Calls passing options only the standard library understands (such as
+    `cls` or `indent`) also use the standard library.
+    """
+
+    def _orjson_option(self) -> int:
+        """
+        Returns the orjson flags matching this provider's settings.
+
+        Returns:
+            int: The orjson option bit mask.
+        """
+        option: int = (orjson.OPT_NON_STR_KEYS
+                       | orjson.OPT_PASSTHROUGH_DATETIME
+                       | orjson.OPT_PASSTHROUGH_DATACLASS)
+        if self.sort_keys:
+            option |= orjson.OPT_SORT_KEYS
+        return option
+
+    def dumps_bytes(self, obj: Any) -> bytes:
+        """
+        Serialize data as compact UTF-8 encoded JSON.
+
+        Args:
+            obj (Any): The data to serialize.
+
+        Returns:
+            bytes: The encoded JSON.
+        """
+        if orjson is not None:
+            encoded: bytes = orjson.dumps(obj, default=self.default,
+                                          option=self._orjson_option())
+            return encoded
+        return super().dumps(obj, separators=(',', ':')).encode()
+
+    def dumps(self, obj: Any, **kwargs: Any) -> str:
+        if orjson is None or set(kwargs) - {'separators'}:
+            return super().dumps(obj, **kwargs)
+        return self.dumps_bytes(obj).decode()
+
+    def loads(self, s: Any, **kwargs: Any) -> Any:
+        if orjson is None or kwargs:
+            return super().loads(s, **kwargs)
+        return orjson.loads(s)
+
+    def response(self, *args: Any, **kwargs: Any) -> Response:
+        if (self.compact is None and self._app.debug) or \
+                self.compact is False:
+            # Pretty-printed output is a debugging aid; leave it to json.
+            return super().response(*args, **kwargs)
+        obj = self._prepare_response_obj(args, kwargs)
+        return self._app.response_class(
+            self.dumps_bytes(obj) + b'\n', mimetype=self.mimetype)
+
+
+class SocketIOJSON:
+    """
+    A json-module stand-in for python-socketio, so that Socket.IO packets are
+    encoded with orjson when it is installed.
+    """
+
+    @staticmethod
+    def dumps(obj: Any, **kwargs: Any) -> str:
+        """
+        Serialize a packet payload as compact JSON.
+
+        Args:
+            obj (Any): The payload.
+            **kwargs (Any): Options for json.dumps, ignored by orjson, which
+            always produces compact output.
+
+        Returns:
+            str: The JSON text.
+        """
+        if orjson is None:
+            return json.dumps(obj, **kwargs)
+        encoded: bytes = orjson.dumps(obj, option=orjson.OPT_NON_STR_KEYS)
+        return encoded.decode()
+
+    @staticmethod
+    def loads(s: Any, **kwargs: Any) -> Any:
+        """
+        Deserialize a packet payload.
+
+        Args:
+            s (Any): JSON text or UTF-8 bytes.
+            **kwargs (Any): Options for json.loads.
+
+        Returns:
+            Any: The decoded payload.
+        """
+        if orjson is None or kwargs:
+            return json.loads(s, **kwargs)
+        return orjson.loads(s)
+
+
+def encode_json(app: Flask, obj: Any) -> bytes:
+    """
+    Serialize data with the application's JSON provider as UTF-8 bytes.
+
+    Args:
+        app (Flask): The application whose provider to use.
+        obj (Any): The data to serialize.
+
+    Returns:
+        bytes: The encoded JSON.
+    """
+    if isinstance(app.json, FastJSONProvider):
+        return app.json.dumps_bytes(obj)
+    return app.json.dumps(obj).encode()
+
+
+def choose_encoding(app: Flask, size: int) -> Optional[str]:
+    """
+    Pick the content encoding for a response body of the given size, based
+    on the current request's Accept-Encoding header.
+
+    Args:
+        app (Flask): The application, whose JSON_COMPRESS_MIN_SIZE setting
+        is the smallest body worth compressing (0 disables compression).
+        size (int): The size of the uncompressed body in bytes.
+
+    Returns:
+        Optional[str]: 'br' or 'gzip', or None to send the body as is.
+    """
+    min_size: int = app.config.get('JSON_COMPRESS_MIN_SIZE', 0)
+    if not min_size or size < min_size:
+        return None
+    encoding: Optional[str] = request.accept_encodings.best_match(ENCODINGS)
+    return encoding
+
+
+def compress(app: Flask, data: bytes, encoding: str) -> bytes:
+    """
+    Compress a body with the given content encoding.
+
+    Args:
+        app (Flask): The application, whose JSON_COMPRESS_LEVEL setting is
+        the gzip level (brotli uses the matching quality, capped at 11).
+        data (bytes): The body to compress.
+        encoding (str): 'br' or 'gzip'.
+
+    Returns:
+        bytes: The compressed body.
+    """
+    level: int = app.config.get('JSON_COMPRESS_LEVEL', 6)
+    if encoding == 'br':
+        compressed: bytes = brotli.compress(data, quality=min(level, 11))
+        return compressed
+    return gzip.compress(data, compresslevel=level, mtime=0)
+
+
+def set_encoded_body(response: Response, data: bytes,
+                     encoding: Optional[str]) -> None:
+    """
+    Set a (possibly compressed) body on a response along with the headers
+    that describe it.
+
+    Args:
+        response (Response): The response to update.
+        data (bytes): The body, already compressed with `encoding`.
+        encoding (Optional[str]): The content encoding, or None.
+    """
+    response.set_data(data)
+    response.vary.add('Accept-Encoding')
+    if encoding is None:
+        return
+    response.headers['Content-Encoding'] = encoding
+    # A compressed body is no longer byte-for-byte the tagged
+    # representation, so only weak comparison can still match.
+    etag, weak = response.get_etag()
+    if etag is not None and not weak:
+        response.set_etag(etag, weak=True)
+
+
+def init_json(app: Flask) -> None:
+    """
+    Install the fast JSON provider on an application and compress its JSON
+    responses that are larger than JSON_COMPRESS_MIN_SIZE.
+
+    Args:
+        app (Flask): The application to configure.
+    """
+    app.json = FastJSONProvider(app)
+
+    @app.after_request
+    def compress_json(response: Response) -> Response:
+        """
+        Compress JSON responses the client accepts in compressed form.
+
+        Args:
+            response (Response): The response to compress.
+
+        Returns:
+            Response: The response, compressed if worthwhile.
+        """
+        if response.mimetype != 'application/json' or \
+                response.is_streamed or response.direct_passthrough or \
+                'Content-Encoding' in response.headers or \
+                response.status_code in (204, 304):
+            return response
+        data = response.get_data()
+        encoding = choose_encoding(app, len(data))
+        if encoding is not None:
+            set_encoded_body(response, compress(app, data, encoding),
+                             encoding)
+        return response
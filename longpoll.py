@@ -1,18 +1,18 @@
-from flask import Flask, jsonify, render_template_string, Response
+from flask import Flask, jsonify, render_template_string, Response, abort
+from flask import request
 import time
-import os
-from config import BaseConfig, ProdConfig, TestConfig
+import redis
+from config import BaseConfig, get_config
+from instrumentation import init_instrumentation
+from json_provider import init_json
+from notifications import NotificationBroker
 import random
+from typing import List, Tuple, Union
 
 app: Flask = Flask(__name__)
 
-# Determine the environment and load the appropriate configuration
-if os.getenv('FLASK_ENV') == 'production':
-    app.config.from_object(ProdConfig)
-elif os.getenv('FLASK_ENV') == 'testing':
-    app.config.from_object(TestConfig)
-else:
-    app.config.from_object(BaseConfig)
+# Load the configuration for the current environment
+app.config.from_object(get_config())
 
 
 def ensure_config_defaults() -> None:
@@ -28,6 +28,16 @@ def ensure_config_defaults() -> None:
 
 ensure_config_defaults()
 
+# Encode JSON with the fast provider and compress large responses
+init_json(app)
+
+# Track connection lifetimes and expose them at /_stats
+init_instrumentation(app)
+
+# Wakes long polls on any worker process when a channel is published to
+broker: NotificationBroker = NotificationBroker(
+    redis.Redis.from_url(app.config['REDIS_URL']), logger=app.logger)
+
 INDEX_HTML: str = """
 <!DOCTYPE html>
 <html>
@@ -56,7 +66,7 @@ INDEX_HTML: str = """
         }
 
         function startPolling() {
-            poll('/api/poll');
+            poll("{{ url_for('poll') }}");
         }
     </script>
 </head>
@@ -84,9 +94,15 @@ def poll() -> Response:
     """
     Handles long polling requests.
 
+    With a `channels` query parameter (comma-separated channel names), waits
+    for messages published to any of them from any worker process.
+    Otherwise waits for the simulated data of get_data().
+
     Returns:
         Response: JSON response with data or timeout status.
     """
+    if 'channels' in request.args:
+        return poll_channels(request.args['channels'].split(','))
     time_start: float = time.time()
     print('Polling started at:', time.strftime('%Y-%m-%d %H:%M:%S',
           time.localtime(time_start)))
@@ -100,6 +116,51 @@ def poll() -> Response:
     return jsonify(data)
 
 
+def poll_channels(channels: List[str]) -> Response:
+    """
+    Waits for messages on one or more notification channels.
+
+    Args:
+        channels (List[str]): The channel names.
+
+    Returns:
+        Response: JSON response with the messages received, each with its
+        channel and data, or timeout status.
+    """
+    channels = [channel for channel in channels if channel]
+    if not channels or len(channels) > app.config['LONGPOLL_MAX_CHANNELS']:
+        abort(400)
+    messages = broker.wait(channels, app.config['LONGPOLL_TIMEOUT'])
+    if not messages:
+        return jsonify({'status': 'No new data'})
+    return jsonify({'messages': messages})
+
+
+@app.route('/api/publish/<channel>', methods=['POST'])
+def publish(channel: str) -> Union[Response, Tuple[Response, int]]:
+    """
+    Publishes the JSON request body to the long polls waiting on a channel,
+    in every worker process.
+
+    Args:
+        channel (str): The channel name.
+
+    Returns:
+        Union[Response, Tuple[Response, int]]: JSON response with the number
+        of worker processes subscribed, or an error if the message could not
+        be published.
+    """
+    data = request.get_json(silent=True)
+    if data is None or ',' in channel:
+        abort(400)
+    try:
+        receivers: int = broker.publish(channel, data)
+    except redis.RedisError as e:
+        app.logger.error(f'Failed to publish to {channel}: {e}')
+        return jsonify(error='Notification service unavailable'), 503
+    return jsonify(receivers=receivers)
+
+
 def get_data() -> dict:
     """
     Simulates data retrieval with a random delay.
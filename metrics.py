@@ -0,0 +1,137 @@
+# metrics.py is a module that defines lightweight in-process metric types
+# shared by the services and the Celery workers.
+import bisect
+import threading
+from typing import Any, Dict, List, Optional, Sequence
+
+# Upper bounds (in seconds) of the default latency buckets. They cover
+# sub-millisecond context pushes up to multi-minute long-lived connections.
+DEFAULT_BUCKETS: Sequence[float] = (
+    0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5,
+    1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0
+)
+
+
+class Histogram:
+    """
+    A thread-safe histogram with fixed bucket boundaries.
+
+    Attributes:
+        bounds (List[float]): Sorted upper bounds of the finite buckets.
+        count (int): Number of observed values.
+        total (float): Sum of all observed values.
+        min (Optional[float]): Smallest observed value.
+        max (Optional[float]): Largest observed value.
+    """
+
+    def __init__(self, buckets: Sequence[float] = DEFAULT_BUCKETS) -> None:
+        """
+        Initializes an empty histogram.
+
+        Parameters:
+            buckets (Sequence[float]): Upper bounds of the finite buckets. An
+            overflow bucket is always added for larger values.
+        """
+        self.bounds: List[float] = sorted(buckets)
+        self._counts: List[int] = [0] * (len(self.bounds) + 1)
+        self._lock = threading.Lock()
+        self.count: int = 0
+        self.total: float = 0.0
+        self.min: Optional[float] = None
+        self.max: Optional[float] = None
+
+    def observe(self, value: float) -> None:
+        """
+        Records a single value.
+
+        Args:
+            value (float): The value to record.
+        """
+        index = bisect.bisect_left(self.bounds, value)
+        with self._lock:
+            self._counts[index] += 1
+            self.count += 1
+            self.total += value
+            if self.min is None or value < self.min:
+                self.min = value
+            if self.max is None or value > self.max:
+                self.max = value
+
+    def merge(self, snapshot: Dict[str, Any]) -> None:
+        """
+        Adds the values summarized by another histogram's snapshot, e.g. one
+        recorded in a different process. Both must use the same buckets.
+
+        Args:
+            snapshot (Dict[str, Any]): The result of `snapshot()`.
+        """
+        buckets: Dict[str, int] = snapshot['buckets']
+        counts = [buckets.get(str(bound), 0) for bound in self.bounds]
+        counts.append(buckets.get('+Inf', 0))
+        with self._lock:
+            for index, count in enumerate(counts):
+                self._counts[index] += count
+            self.count += snapshot['count']
+            self.total += snapshot['sum']
+            for value in (snapshot['min'], snapshot['max']):
+                if value is None:
+                    continue
+                if self.min is None or value < self.min:
+                    self.min = value
+                if self.max is None or value > self.max:
+                    self.max = value
+
+    def percentile(self, q: float) -> Optional[float]:
+        """
+        Estimates a percentile from the bucket counts.
+
+        The estimate is the upper bound of the bucket that contains the
+        requested rank, clamped to the observed maximum.
+
+        Args:
+            q (float): The percentile to estimate, between 0 and 100.
+
+        Returns:
+            Optional[float]: The estimated value, or None if nothing was
+            observed.
+        """
+        with self._lock:
+            if self.count == 0:
+                return None
+            rank = q / 100.0 * self.count
+            seen = 0
+            for index, bucket_count in enumerate(self._counts):
+                seen += bucket_count
+                if seen >= rank and bucket_count:
+                    if index < len(self.bounds):
+                        return min(self.bounds[index], self.max or 0.0)
+                    break
+            return self.max
+
+    def snapshot(self) -> Dict[str, Any]:
+        """
+        Returns a JSON-serializable view of the histogram.
+
+        Returns:
+            Dict[str, Any]: Count, sum, min, max, p50/p90/p99 estimates and
+            the cumulative-free bucket counts keyed by upper bound.
+        """
+        p50 = self.percentile(50)
+        p90 = self.percentile(90)
+        p99 = self.percentile(99)
+        with self._lock:
+            buckets = {
+                str(bound): count
+                for bound, count in zip(self.bounds, self._counts)
+            }
+            buckets['+Inf'] = self._counts[-1]
+            return {
+                'count': self.count,
+                'sum': self.total,
+                'min': self.min,
+                'max': self.max,
+                'p50': p50,
+                'p90': p90,
+                'p99': p99,
+                'buckets': buckets,
+            }
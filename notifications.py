@@ -0,0 +1,184 @@
+# notifications.py is a module that delivers long-poll notifications across
+# worker processes over Redis pub/sub.
+import json
+import logging
+import threading
+import time
+import redis
+from typing import Any, Dict, Iterable, List, Optional, Set
+
+Message = Dict[str, Any]
+
+
+class Waiter:
+    """
+    A long-poll request parked until a message arrives on one of its
+    channels.
+    """
+
+    def __init__(self, channels: Iterable[str]) -> None:
+        """
+        Initializes the waiter.
+
+        Args:
+            channels (Iterable[str]): The channels to wait on.
+        """
+        self.channels: Set[str] = set(channels)
+        self.event = threading.Event()
+        self.messages: List[Message] = []
+
+
+class NotificationBroker:
+    """
+    Fans Redis pub/sub messages out to the long-poll requests of this
+    process.
+
+    Each process holds a single subscription, to every channel under the
+    broker's prefix, on a background thread that is started by the first
+    request, so that it is created in the worker after any fork. Messages are
+    delivered to the requests waiting when they arrive; nothing is queued for
+    requests that are not waiting.
+    """
+
+    def __init__(self, client: redis.Redis, prefix: str = 'longpoll:',
+                 logger: Optional[logging.Logger] = None) -> None:
+        """
+        Initializes the broker.
+
+        Args:
+            client (redis.Redis): The Redis client to publish and subscribe
+            with.
+            prefix (str): Prefix of the Redis channel names.
+            logger (Optional[logging.Logger]): Where to log connection
+            errors.
+        """
+        self.client = client
+        self.prefix: str = prefix
+        self.logger = logger or logging.getLogger(__name__)
+        self.lock = threading.Lock()
+        self.waiters: Dict[str, Set[Waiter]] = {}
+        self.ready = threading.Event()
+        self._started: bool = False
+
+    def start(self, timeout: float = 5.0) -> None:
+        """
+        Starts the subscriber thread, once per process, and waits until the
+        subscription is active.
+
+        Args:
+            timeout (float): Seconds to wait for the subscription.
+        """
+        if not self._started:
+            with self.lock:
+                if not self._started:
+                    self._started = True
+                    threading.Thread(target=self.run, name='notifications',
+                                     daemon=True).start()
+        self.ready.wait(timeout)
+
+    def run(self) -> None:
+        """
+        Receives messages and dispatches them to the waiters, reconnecting
+        with a growing delay when the connection to Redis is lost or the
+        subscription fails in any other way.
+        """
+        delay: float = 0.1
+        while True:
+            pubsub = self.client.pubsub()
+            try:
+                pubsub.psubscribe(f'{self.prefix}*')
+                for message in pubsub.listen():
+                    if message['type'] == 'psubscribe':
+                        self.ready.set()
+                        delay = 0.1
+                    elif message['type'] == 'pmessage':
+                        self.receive(message['channel'], message['data'])
+            except redis.RedisError as e:
+                self.logger.warning(f'Notification subscription lost: {e}')
+            except Exception:
+                self.logger.exception('Notification subscription failed')
+            finally:
+                self.ready.clear()
+                pubsub.close()
+            time.sleep(delay)
+            delay = min(delay * 2, 5.0)
+
+    def receive(self, channel: bytes, data: bytes) -> None:
+        """
+        Decodes a published message and dispatches it, skipping messages
+        that were not published as JSON by `publish()`.
+
+        Args:
+            channel (bytes): The Redis channel, including the prefix.
+            data (bytes): The JSON-encoded message.
+        """
+        try:
+            name: str = channel.decode()[len(self.prefix):]
+            decoded = json.loads(data)
+        except ValueError as e:
+            self.logger.warning(
+                f'Ignoring malformed notification on {channel!r}: {e}')
+            return
+        self.dispatch(name, decoded)
+
+    def dispatch(self, channel: str, data: Any) -> None:
+        """
+        Hands a message to every request waiting on its channel.
+
+        Args:
+            channel (str): The channel, without the prefix.
+            data (Any): The decoded message.
+        """
+        message: Message = {'channel': channel, 'data': data}
+        with self.lock:
+            waiters = list(self.waiters.get(channel, ()))
+            for waiter in waiters:
+                waiter.messages.append(message)
+        for waiter in waiters:
+            waiter.event.set()
+
+    def wait(self, channels: Iterable[str], timeout: float) -> List[Message]:
+        """
+        Waits for the next message on any of the given channels.
+
+        Args:
+            channels (Iterable[str]): The channels to wait on.
+            timeout (float): Seconds to wait.
+
+        Returns:
+            List[Message]: The messages received, oldest first, or an empty
+            list if none arrived before the timeout.
+        """
+        deadline: float = time.monotonic() + timeout
+        self.start(timeout)
+        waiter = Waiter(channels)
+        with self.lock:
+            for channel in waiter.channels:
+                self.waiters.setdefault(channel, set()).add(waiter)
+        try:
+            waiter.event.wait(max(0.0, deadline - time.monotonic()))
+        finally:
+            with self.lock:
+                for channel in waiter.channels:
+                    channel_waiters = self.waiters.get(channel)
+                    if channel_waiters is not None:
+                        channel_waiters.discard(waiter)
+                        if not channel_waiters:
+                            del self.waiters[channel]
+                messages = list(waiter.messages)
+        return messages
+
+    def publish(self, channel: str, data: Any) -> int:
+        """
+        Publishes a message to the waiters on a channel in every process.
+
+        Args:
+            channel (str): The channel, without the prefix.
+            data (Any): The JSON-serializable message.
+
+        Returns:
+            int: The number of processes subscribed.
+        """
+        receivers: int = self.client.publish(f'{self.prefix}{channel}',
+                                             json.dumps(data))
+        return receivers
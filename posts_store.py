@@ -0,0 +1,229 @@
+# posts_store.py is a module that defines the storage backends behind the
+# blog post endpoints in corsapp.py.
+import bisect
+import sqlite3
+import threading
+from abc import ABC, abstractmethod
+from typing import Any, Dict, List, Mapping, Optional, Tuple
+
+Post = Dict[str, str]
+Page = Tuple[Dict[str, Post], Optional[str]]
+
+
+class PostsStore(ABC):
+    """
+    The interface shared by all posts backends.
+
+    Posts are ordered by id and listed with cursor-based pagination: a page
+    holds the posts whose id sorts after the cursor, and the id of the last
+    post on a page is the cursor for the next one. Every mutation bumps the
+    store's version, which callers use to invalidate cached responses.
+    """
+
+    @abstractmethod
+    def list(self, after: Optional[str], limit: int) -> Page:
+        """
+        Returns one page of posts.
+
+        Args:
+            after (Optional[str]): Only return posts whose id sorts after
+            this cursor, or all posts from the start if None.
+            limit (int): The maximum number of posts to return.
+
+        Returns:
+            Page: The posts keyed by id, and the cursor of the next page, or
+            None if this is the last page.
+        """
+
+    @abstractmethod
+    def put(self, post_id: str, post: Post) -> None:
+        """
+        Creates or replaces a post.
+
+        Args:
+            post_id (str): The ID of the post.
+            post (Post): The post to store.
+        """
+
+    @abstractmethod
+    def delete(self, post_id: str) -> bool:
+        """
+        Deletes a post.
+
+        Args:
+            post_id (str): The ID of the post to delete.
+
+        Returns:
+            bool: True if the post existed and was deleted, otherwise False.
+        """
+
+    @abstractmethod
+    def version(self) -> int:
+        """
+        Returns a counter that changes whenever the stored posts change.
+
+        Returns:
+            int: The current version.
+        """
+
+
+class InMemoryPostsStore(PostsStore):
+    """
+    A posts store held in process memory and protected by a lock.
+
+    The ids are additionally kept in a sorted list, so a page is found by
+    binary search instead of by sorting the whole collection.
+    """
+
+    def __init__(self, posts: Optional[Mapping[str, Post]] = None) -> None:
+        """
+        Initializes the store.
+
+        Parameters:
+            posts (Optional[Mapping[str, Post]]): Initial posts keyed by id.
+        """
+        self._lock = threading.Lock()
+        self._posts: Dict[str, Post] = dict(posts or {})
+        self._ids: List[str] = sorted(self._posts)
+        self._version: int = 0
+
+    def list(self, after: Optional[str], limit: int) -> Page:
+        with self._lock:
+            start = 0 if after is None else bisect.bisect_right(self._ids,
+                                                                after)
+            ids = self._ids[start:start + limit + 1]
+            posts = {post_id: self._posts[post_id] for post_id in ids[:limit]}
+        next_cursor = ids[limit - 1] if len(ids) > limit else None
+        return posts, next_cursor
+
+    def put(self, post_id: str, post: Post) -> None:
+        with self._lock:
+            if post_id not in self._posts:
+                bisect.insort(self._ids, post_id)
+            self._posts[post_id] = dict(post)
+            self._version += 1
+
+    def delete(self, post_id: str) -> bool:
+        with self._lock:
+            if self._posts.pop(post_id, None) is None:
+                return False
+            del self._ids[bisect.bisect_left(self._ids, post_id)]
+            self._version += 1
+            return True
+
+    def version(self) -> int:
+        return self._version
+
+
+class SQLitePostsStore(PostsStore):
+    """
+    A posts store backed by an SQLite database file.
+
+    Posts live in a WITHOUT ROWID table keyed by id, so pages are read
+    straight off the primary key index. Each thread uses its own connection,
+    and the version is kept in the database so that every process sharing
+    the file sees the same value.
+    """
+
+    def __init__(self, path: str,
+                 posts: Optional[Mapping[str, Post]] = None) -> None:
+        """
+        Opens the database, creating the schema if needed.
+
+        Parameters:
+            path (str): Path of the SQLite database file.
+            posts (Optional[Mapping[str, Post]]): Posts to seed a newly
+            created database with.
+        """
+        self.path: str = path
+        self._local = threading.local()
+        conn = self._connection()
+        with conn:
+            # Take the write lock before checking for the schema, so that
+            # only one of several processes opening a new file seeds it.
+            conn.execute('BEGIN IMMEDIATE')
+            created = conn.execute(
+                "SELECT 1 FROM sqlite_master WHERE name = 'posts'"
+            ).fetchone() is None
+            conn.execute(
+                'CREATE TABLE IF NOT EXISTS posts ('
+                'id TEXT PRIMARY KEY, post TEXT NOT NULL) WITHOUT ROWID')
+            conn.execute(
+                'CREATE TABLE IF NOT EXISTS posts_meta ('
+                'id INTEGER PRIMARY KEY CHECK (id = 0), '
+                'version INTEGER NOT NULL)')
+            conn.execute(
+                'INSERT OR IGNORE INTO posts_meta (id, version) VALUES (0, 0)')
+            if created and posts:
+                conn.executemany(
+                    'INSERT INTO posts (id, post) VALUES (?, ?)',
+                    [(post_id, post['post'])
+                     for post_id, post in posts.items()])
+
+    def _connection(self) -> sqlite3.Connection:
+        """
+        Returns the calling thread's connection, opening it on first use.
+
+        Returns:
+            sqlite3.Connection: The connection.
+        """
+        conn: Optional[sqlite3.Connection] = getattr(self._local, 'conn',
+                                                     None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=10)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self._local.conn = conn
+        return conn
+
+    def list(self, after: Optional[str], limit: int) -> Page:
+        rows: List[Tuple[str, str]] = self._connection().execute(
+            'SELECT id, post FROM posts WHERE id > ? ORDER BY id LIMIT ?',
+            ('' if after is None else after, limit + 1)
+        ).fetchall()
+        posts = {post_id: {'post': post} for post_id, post in rows[:limit]}
+        next_cursor = rows[limit - 1][0] if len(rows) > limit else None
+        return posts, next_cursor
+
+    def put(self, post_id: str, post: Post) -> None:
+        conn = self._connection()
+        with conn:
+            conn.execute(
+                'INSERT OR REPLACE INTO posts (id, post) VALUES (?, ?)',
+                (post_id, post['post']))
+            conn.execute('UPDATE posts_meta SET version = version + 1')
+
+    def delete(self, post_id: str) -> bool:
+        conn = self._connection()
+        with conn:
+            deleted = conn.execute(
+                'DELETE FROM posts WHERE id = ?', (post_id,)).rowcount > 0
+            if deleted:
+                conn.execute('UPDATE posts_meta SET version = version + 1')
+        return deleted
+
+    def version(self) -> int:
+        row: Tuple[int] = self._connection().execute(
+            'SELECT version FROM posts_meta').fetchone()
+        return row[0]
+
+
+def make_posts_store(config: Mapping[str, Any],
+                     posts: Optional[Mapping[str, Post]] = None) -> PostsStore:
+    """
+    Create the posts store selected by the application configuration.
+
+    Args:
+        config (Mapping[str, Any]): The Flask configuration. POSTS_STORE
+        selects 'memory' or 'sqlite', and POSTS_DB_PATH is the SQLite file.
+        posts (Optional[Mapping[str, Post]]): Posts to seed a new store with.
+
+    Returns:
+        PostsStore: The configured store.
+    """
+    backend: str = config.get('POSTS_STORE', 'memory')
+    if backend == 'memory':
+        return InMemoryPostsStore(posts)
+    if backend == 'sqlite':
+        return SQLitePostsStore(config['POSTS_DB_PATH'], posts)
+    raise ValueError(f'Unknown posts store: {backend}')
@@ -0,0 +1,397 @@
+# ratelimit.py is a module that defines per-client rate limiting and
+# admission control for the expensive endpoints of the Flask applications.
+import functools
+import math
+import redis
+import threading
+import time
+from abc import ABC, abstractmethod
+from flask import Flask, Response, jsonify, request
+from typing import Any, Callable, Dict, Mapping, Optional, Tuple, TypeVar
+
+View = TypeVar('View', bound=Callable[..., Any])
+
+# Seconds clients are asked to wait after a request is shed for lack of
+# capacity; slots free up as soon as in-flight requests finish.
+SHED_RETRY_AFTER: int = 1
+
+
+class RateLimitBackend(ABC):
+    """
+    The interface shared by all token bucket backends.
+
+    Each key has a bucket holding up to `burst` tokens that refills at `rate`
+    tokens per second. A request takes one token, or is refused if the
+    bucket is empty.
+    """
+
+    @abstractmethod
+    def take(self, key: str, rate: float, burst: int) -> float:
+        """
+        Takes a token from a bucket.
+
+        Args:
+            key (str): The bucket's key.
+            rate (float): Tokens added to the bucket per second.
+            burst (int): The bucket's capacity.
+
+        Returns:
+            float: 0 if a token was taken, otherwise the seconds until one
+            will be available.
+        """
+
+
+class InMemoryRateLimitBackend(RateLimitBackend):
+    """
+    Token buckets held in process memory and protected by a lock.
+
+    Each worker process keeps its own buckets, so with several workers a
+    client may get up to that many times the configured rate.
+    """
+
+    def __init__(self, max_keys: int = 10000) -> None:
+        """
+        Initializes the backend.
+
+        Args:
+            max_keys (int): Number of buckets above which full buckets are
+            discarded, bounding memory use.
+        """
+        self.lock = threading.Lock()
+        self.max_keys: int = max_keys
+        # Tokens left, when they were counted and when the bucket will be
+        # full again, keyed by bucket.
+        self.buckets: Dict[str, Tuple[float, float, float]] = {}
+
+    def take(self, key: str, rate: float, burst: int) -> float:
+        now: float = time.monotonic()
+        with self.lock:
+            tokens, updated, _ = self.buckets.get(
+                key, (float(burst), now, now))
+            tokens = min(float(burst), tokens + (now - updated) * rate)
+            wait: float = 0.0
+            if tokens >= 1:
+                tokens -= 1
+            else:
+                wait = (1 - tokens) / rate
+            self.buckets[key] = (tokens, now, now + (burst - tokens) / rate)
+            if len(self.buckets) > self.max_keys:
+                self.prune(now)
+        return wait
+
+    def prune(self, now: float) -> None:
+        """
+        Discards the buckets that have refilled completely, which behave the
+        same as missing ones. Must be called with the lock held.
+
+        Args:
+            now (float): The current time.monotonic() value.
+        """
+        self.buckets = {
+            key: bucket for key, bucket in self.buckets.items()
+            if bucket[2] > now
+        }
+
+
+class RedisRateLimitBackend(RateLimitBackend):
+    """
+    Token buckets kept in Redis and shared by all worker processes.
+
+    Each take is a single Lua script run atomically on the server, using the
+    server's clock so the workers need not agree on the time. Buckets expire
+    once they would have refilled. Requires Redis 5 or later.
+    """
+
+    SCRIPT: str = """
+local rate = tonumber(ARGV[1])
+local burst = tonumber(ARGV[2])
+local time = redis.call('TIME')
+local now = tonumber(time[1]) + tonumber(time[2]) / 1000000
+local bucket = redis.call('HMGET', KEYS[1], 'tokens', 'updated')
+local tokens = tonumber(bucket[1]) or burst
+local updated = tonumber(bucket[2]) or now
+tokens = math.min(burst, tokens + math.max(0, now - updated) * rate)
+local wait = 0
+if tokens >= 1 then
+    tokens = tokens - 1
+else
+    wait = (1 - tokens) / rate
+end
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens),
+           'updated', tostring(now))
+redis.call('PEXPIRE', KEYS[1], math.ceil(burst / rate * 1000))
+return tostring(wait)
+"""
+
+    def __init__(self, url: str) -> None:
+        """
+        Initializes the backend.
+
+        Args:
+            url (str): The Redis URL, e.g. redis://localhost:6379/0.
+        """
+        self.client = redis.Redis.from_url(url)
+        self.script = self.client.register_script(self.SCRIPT)
+
+    def take(self, key: str, rate: float, burst: int) -> float:
+        # Lua numbers are truncated to integers when returned, so the wait
+        # comes back as a string.
+        wait: bytes = self.script(keys=[key], args=[rate, burst])
+        return float(wait)
+
+
+def make_rate_limit_backend(config: Mapping[str, Any]) -> RateLimitBackend:
+    """
+    Create the rate limit backend selected by the application configuration.
+
+    Args:
+        config (Mapping[str, Any]): The Flask configuration.
+        RATELIMIT_STORAGE selects 'memory' or 'redis', and REDIS_URL is the
+        Redis server.
+
+    Returns:
+        RateLimitBackend: The configured backend.
+    """
+    storage: str = config.get('RATELIMIT_STORAGE', 'memory')
+    if storage == 'memory':
+        return InMemoryRateLimitBackend()
+    if storage == 'redis':
+        return RedisRateLimitBackend(config['REDIS_URL'])
+    raise ValueError(f'Unknown rate limit storage: {storage}')
+
+
+class RateLimiter:
+    """
+    Guards views with a token bucket per client and endpoint, and with a
+    limit on the requests the process serves concurrently across all
+    guarded views.
+
+    Requests over a client's rate are refused with 429 Too Many Requests,
+    and requests arriving while every slot is taken are shed at once with
+    503 Service Unavailable rather than queueing behind slow upstream calls.
+    Both carry a Retry-After header.
+    """
+
+    def __init__(self, app: Flask, backend: RateLimitBackend, rate: float,
+                 burst: int, max_concurrent: int) -> None:
+        """
+        Initializes the limiter.
+
+        Parameters:
+            app (Flask): The application whose views are guarded.
+            backend (RateLimitBackend): Where the token buckets are kept.
+            rate (float): Default requests per second allowed per client
+            and endpoint, or 0 to disable rate limiting.
+            burst (int): Default number of requests a client may make at
+            once before being held to the rate.
+            max_concurrent (int): Requests served at once across the guarded
+            views of this process, or 0 for no limit.
+        """
+        self.app = app
+        self.backend = backend
+        self.rate: float = rate
+        self.burst: int = burst
+        self.slots: Optional[threading.BoundedSemaphore] = (
+            threading.BoundedSemaphore(max_concurrent)
+            if max_concurrent else None)
+
+    def wait_time(self, rate: float, burst: int) -> float:
+        """
+        Takes a token for the current request's client and endpoint.
+
+        The request is let through if the backend fails, so an unreachable
+        Redis server does not take the endpoints down with it.
+
+        Args:
+            rate (float): Requests per second allowed.
+            burst (int): The bucket's capacity.
+
+        Returns:
+            float: 0 if the request may proceed, otherwise the seconds until
+            the client may retry.
+        """
+        key: str = f'ratelimit:{request.endpoint}:{request.remote_addr}'
+        try:
+            return self.backend.take(key, rate, burst)
+        except Exception as e:
+            self.app.logger.warning(f'Rate limit backend failed: {e}')
+            return 0.0
+
+    def limit(self, rate: Optional[float] = None,
+              burst: Optional[int] = None) -> Callable[[View], View]:
+        """
+        Returns a decorator that guards a view.
+
+        Args:
+            rate (Optional[float]): Requests per second allowed per client
+            for this view, overriding the limiter's default.
+            burst (Optional[int]): Bucket capacity for this view, overriding
+            the limiter's default.
+
+        Returns:
+            Callable[[View], View]: The decorator.
+        """
+        view_rate: float = self.rate if rate is None else rate
+        view_burst: int = self.burst if burst is None else burst
+
+        def decorator(view: View) -> View:
+            @functools.wraps(view)
+            def guarded(*args: Any, **kwargs: Any) -> Any:
+                if view_rate:
+                    wait = self.wait_time(view_rate, view_burst)
+                    if wait:
+                        return refuse(
+                            'Rate limit exceeded', 429, math.ceil(wait))
+                if self.slots is None:
+                    return view(*args, **kwargs)
+                if not self.slots.acquire(blocking=False):
+                    return refuse(
+                        'Server busy', 503, SHED_RETRY_AFTER)
+                try:
+                    return view(*args, **kwargs)
+                finally:
+                    self.slots.release()
+            return guarded  # type: ignore
+        return decorator
+
+
+class TaskAdmission:
+    """
+    Limits the Celery tasks an endpoint has queued or running at once,
+    across all worker processes.
+
+    Each admitted task is added to a Redis sorted set, scored by the time it
+    was admitted, and removed by the task when it finishes. Entries older
+    than the timeout are dropped, so tasks lost with their worker do not
+    hold their place forever. Requires Redis 5 or later.
+    """
+
+    SCRIPT: str = """
+local limit = tonumber(ARGV[1])
+local timeout = tonumber(ARGV[2])
+local time = redis.call('TIME')
+local now = tonumber(time[1]) + tonumber(time[2]) / 1000000
+redis.call('ZREMRANGEBYSCORE', KEYS[1], '-inf', now - timeout)
+if redis.call('ZCARD', KEYS[1]) >= limit then
+    return 0
+end
+redis.call('ZADD', KEYS[1], now, ARGV[3])
+redis.call('EXPIRE', KEYS[1], timeout)
+return 1
+"""
+
+    def __init__(self, app: Flask, key: str, limit: int,
+                 timeout: int) -> None:
+        """
+        Initializes the admission control.
+
+        Parameters:
+            app (Flask): The application queuing the tasks; REDIS_URL is the
+            Redis server.
+            key (str): The Redis key of the set of outstanding tasks.
+            limit (int): Tasks allowed at once, or 0 for no limit.
+            timeout (int): Seconds after which a task no longer counts.
+        """
+        self.app = app
+        self.key: str = key
+        self.limit: int = limit
+        self.timeout: int = timeout
+        self.client = redis.Redis.from_url(app.config['REDIS_URL'])
+        self.script = self.client.register_script(self.SCRIPT)
+
+    def admit(self, task_id: str) -> bool:
+        """
+        Counts a task about to be queued, unless the limit is reached.
+
+        The task is admitted if Redis fails, so an unreachable server does
+        not take the endpoint down with it.
+
+        Args:
+            task_id (str): The id the task will be queued with.
+
+        Returns:
+            bool: Whether the task may be queued.
+        """
+        if not self.limit:
+            return True
+        try:
+            admitted: int = self.script(
+                keys=[self.key], args=[self.limit, self.timeout, task_id])
+        except redis.RedisError as e:
+            self.app.logger.warning(f'Task admission failed: {e}')
+            return True
+        return bool(admitted)
+
+    def release(self, task_id: str) -> None:
+        """
+        Stops counting a task, once it finished or could not be queued.
+
+        Args:
+            task_id (str): The task's id.
+        """
+        if not self.limit:
+            return
+        try:
+            self.client.zrem(self.key, task_id)
+        except redis.RedisError as e:
+            self.app.logger.warning(f'Task release failed: {e}')
+
+
+def refuse(error: str, status: int,
+           retry_after: int) -> Tuple[Response, int]:
+    """
+    Builds the JSON response of a refused request.
+
+    Args:
+        error (str): The error message.
+        status (int): 429 or 503.
+        retry_after (int): Seconds the client should wait before retrying.
+
+    Returns:
+        Tuple[Response, int]: The response and its status code.
+    """
+    response = jsonify(error=error)
+    response.headers['Retry-After'] = str(retry_after)
+    return response, status
+
+
+def init_rate_limit(app: Flask) -> RateLimiter:
+    """
+    Create the rate limiter of a Flask application from its configuration.
+
+    RATELIMIT_RATE and RATELIMIT_BURST set the default token bucket of each
+    client and endpoint (a rate of 0 disables rate limiting), and
+    RATELIMIT_MAX_CONCURRENT the requests the guarded views serve at once
+    (0 disables the limit). Views are guarded with `@limiter.limit()`.
+
+    Args:
+        app (Flask): The application to guard.
+
+    Returns:
+        RateLimiter: The limiter.
+    """
+    return RateLimiter(app, make_rate_limit_backend(app.config),
+                       app.config.get('RATELIMIT_RATE', 0),
+                       app.config.get('RATELIMIT_BURST', 1),
+                       app.config.get('RATELIMIT_MAX_CONCURRENT', 0))
+
+
+def init_task_admission(app: Flask, name: str) -> TaskAdmission:
+    """
+    Create the admission control of the tasks an endpoint queues from the
+    application configuration.
+
+    TASKS_MAX_OUTSTANDING sets the tasks allowed at once (0 disables the
+    limit) and TASKS_OUTSTANDING_TIMEOUT the seconds after which a task
+    stops counting.
+
+    Args:
+        app (Flask): The application queuing the tasks.
+        name (str): Names the set of tasks, e.g. after the task.
+
+    Returns:
+        TaskAdmission: The admission control.
+    """
+    return TaskAdmission(app, f'tasks:outstanding:{name}',
+                         app.config.get('TASKS_MAX_OUTSTANDING', 0),
+                         app.config.get('TASKS_OUTSTANDING_TIMEOUT', 600))
@@ -0,0 +1,84 @@
+"""
+bench_cold_start.py: Cold-start cost of the gateway versus one process per
+service.
+
+Every measurement runs in a fresh interpreter and reports the time taken to
+import the application and the peak resident set size (RSS) of the process
+afterwards. The separate-process total is the sum over all services, as if
+each was launched on its own.
+
+Usage:
+    python scripts/bench_cold_start.py [--services sync,sse,...]
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+from typing import Dict, List
+
+ROOT: str = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.insert(0, ROOT)
+
+from gateway import SERVICES  # noqa: E402
+
+PROBE: str = """
+import json, resource, sys, time
+start = time.perf_counter()
+{body}
+elapsed = time.perf_counter() - start
+rss_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+print(json.dumps({{'import_s': elapsed, 'rss_mb': rss_kb / 1024}}))
+"""
+
+
+def probe(body: str, env: Dict[str, str]) -> Dict[str, float]:
+    """
+    Runs a snippet in a fresh interpreter and collects its measurements.
+
+    Args:
+        body (str): The code whose import cost is measured.
+        env (Dict[str, str]): Environment of the child process.
+
+    Returns:
+        Dict[str, float]: Import time in seconds and peak RSS in MiB.
+    """
+    output = subprocess.run(
+        [sys.executable, '-c', PROBE.format(body=body)],
+        cwd=ROOT, env=env, check=True, capture_output=True, text=True
+    ).stdout
+    result: Dict[str, float] = json.loads(output.strip().splitlines()[-1])
+    return result
+
+
+def main() -> None:
+    """
+    Parses arguments and prints a table of cold-start measurements.
+    """
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('--services', default=','.join(SERVICES))
+    args = parser.parse_args()
+    services: List[str] = args.services.split(',')
+    env = dict(os.environ, GATEWAY_SERVICES=args.services)
+
+    rows: Dict[str, Dict[str, float]] = {}
+    for name in services:
+        rows[name] = probe(f'import {name}', env)
+    rows['separate (sum)'] = {
+        key: sum(rows[name][key] for name in services)
+        for key in ('import_s', 'rss_mb')
+    }
+    rows['gateway'] = probe('import gateway', env)
+    rows['gateway (all loaded)'] = probe(
+        'import gateway\n'
+        'for lazy in gateway.mounts.values():\n'
+        '    lazy.load()', env)
+
+    print(f'{"":<22} {"import (s)":>10} {"peak RSS (MiB)":>15}')
+    for name, row in rows.items():
+        print(f'{name:<22} {row["import_s"]:>10.3f} {row["rss_mb"]:>15.1f}')
+
+
+if __name__ == '__main__':
+    main()
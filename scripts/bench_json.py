@@ -0,0 +1,111 @@
+"""
+bench_json.py: Micro-benchmark of JSON serialization and compression.
+
+Serializes the payloads the services send most, the 100-repository GitHub
+search result fetched by taskapp.py, the processed repository list it
+broadcasts, and the full Stripe charge emitted by websockets.py, with the
+standard library, with the shared JSON provider and Socket.IO encoder, and
+with orjson directly when it is installed. It then reports the size and cost
+of compressing each payload with gzip and, when installed, brotli.
+
+Usage:
+    python scripts/bench_json.py [--iterations N]
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+from datetime import datetime
+from typing import Any, Callable, Dict, List
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from flask import Flask  # noqa: E402
+from json_provider import ENCODINGS, FastJSONProvider  # noqa: E402
+from json_provider import SocketIOJSON, compress, orjson  # noqa: E402
+from stubs import charge, repositories  # noqa: E402
+
+
+def payloads() -> Dict[str, Any]:
+    """
+    Builds the payloads to serialize.
+
+    Returns:
+        Dict[str, Any]: Payloads keyed by name.
+    """
+    repos: List[Dict[str, Any]] = repositories(100)
+    return {
+        'github_search': {
+            'total_count': len(repos),
+            'incomplete_results': False,
+            'items': repos,
+        },
+        'processed_repos': {
+            'data': [{'name': repo['name'],
+                      'stars': repo['stargazers_count']}
+                     for repo in repos],
+        },
+        'charge_status': {
+            'status': 'pending',
+            'charge': charge('ch_3MmlLrLkdIwHu7ix0snN0B15', 1099, 'usd'),
+            'timestamp': datetime.now().isoformat(),
+        },
+    }
+
+
+def measure(iterations: int, func: Callable[[], Any]) -> float:
+    """
+    Times repeated calls of a function.
+
+    Args:
+        iterations (int): Number of calls.
+        func (Callable[[], Any]): The function to call.
+
+    Returns:
+        float: Microseconds per call.
+    """
+    start: float = time.perf_counter()
+    for _ in range(iterations):
+        func()
+    return (time.perf_counter() - start) / iterations * 1e6
+
+
+def main() -> None:
+    """
+    Parses arguments and benchmarks every payload.
+    """
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('--iterations', type=int, default=2000)
+    args = parser.parse_args()
+
+    app = Flask(__name__)
+    provider = FastJSONProvider(app)
+    print(f"orjson: {'installed' if orjson is not None else 'missing'}, "
+          f"encodings: {', '.join(ENCODINGS)}")
+
+    for name, payload in payloads().items():
+        encoders: Dict[str, Callable[[], Any]] = {
+            'stdlib': lambda: json.dumps(payload),
+            'provider': lambda: provider.dumps_bytes(payload),
+            'socketio': lambda: SocketIOJSON.dumps(payload),
+        }
+        if orjson is not None:
+            encoders['orjson'] = lambda: orjson.dumps(payload)
+        body: bytes = provider.dumps_bytes(payload)
+        print(f'\n{name} ({len(body)} bytes)')
+        for label, encode in encoders.items():
+            micros = measure(args.iterations, encode)
+            print(f'  {label:<10} {micros:>10.1f} us')
+        for encoding in ENCODINGS:
+            compressed = compress(app, body, encoding)
+            micros = measure(args.iterations,
+                             lambda: compress(app, body, encoding))
+            ratio: float = len(compressed) / len(body)
+            print(f'  {encoding:<10} {micros:>10.1f} us '
+                  f'{len(compressed):>8} bytes ({ratio:.0%})')
+
+
+if __name__ == '__main__':
+    main()
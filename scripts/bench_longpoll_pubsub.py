@@ -0,0 +1,344 @@
+"""
+bench_longpoll_pubsub.py: Wake-up latency of channel long polls across
+worker processes.
+
+Starts a minimal stand-in for the Redis pub/sub commands the notification
+broker uses, launches longpoll.py twice as separate single-worker servers
+pointed at it, parks long polls on both, and publishes through the second
+one. The time from publishing until each poll returns is reported
+separately for polls on the publishing worker and on the other worker, the
+latter having travelled through the pub/sub server.
+
+Usage:
+    python scripts/bench_longpoll_pubsub.py [--rounds N] [--pollers N]
+        [--model threaded|gevent|asgi]
+"""
+
+import argparse
+import fnmatch
+import http.client
+import json
+import os
+import socketserver
+import sys
+import threading
+import time
+from typing import Dict, Iterable, List, Optional, Set
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from loadtest import free_port, percentile, start_app  # noqa: E402
+
+
+def bulk(value: bytes) -> bytes:
+    """
+    Encodes a RESP bulk string.
+
+    Args:
+        value (bytes): The string.
+
+    Returns:
+        bytes: The encoded string.
+    """
+    return b'$%d\r\n%s\r\n' % (len(value), value)
+
+
+def array(*items: bytes) -> bytes:
+    """
+    Encodes a RESP array of already encoded items.
+
+    Args:
+        *items (bytes): The encoded items.
+
+    Returns:
+        bytes: The encoded array.
+    """
+    return b'*%d\r\n%s' % (len(items), b''.join(items))
+
+
+class PubSubHandler(socketserver.StreamRequestHandler):
+    """
+    Serves one client connection of the Redis stand-in.
+    """
+    server: 'PubSubServer'
+
+    def setup(self) -> None:
+        super().setup()
+        self.write_lock = threading.Lock()
+        self.patterns: Set[bytes] = set()
+
+    def send(self, data: bytes) -> None:
+        """
+        Writes to the client; messages may be published from other
+        connections' threads at any time.
+
+        Args:
+            data (bytes): The encoded reply.
+        """
+        with self.write_lock:
+            self.connection.sendall(data)
+
+    def read_command(self) -> Optional[List[bytes]]:
+        """
+        Reads one command.
+
+        Returns:
+            Optional[List[bytes]]: The command and its arguments, or None
+            when the client disconnected.
+        """
+        line = self.rfile.readline()
+        if not line:
+            return None
+        if not line.startswith(b'*'):
+            return line.split()
+        args: List[bytes] = []
+        for _ in range(int(line[1:])):
+            length = int(self.rfile.readline()[1:])
+            args.append(self.rfile.read(length + 2)[:-2])
+        return args
+
+    def handle(self) -> None:
+        try:
+            while True:
+                command = self.read_command()
+                if command is None:
+                    return
+                self.execute(command[0].upper(), command[1:])
+        except (ConnectionError, ValueError):
+            pass
+        finally:
+            self.server.unsubscribe(self, self.patterns)
+
+    def execute(self, name: bytes, args: List[bytes]) -> None:
+        """
+        Runs one command and writes its reply.
+
+        Args:
+            name (bytes): The command name, upper case.
+            args (List[bytes]): The command arguments.
+        """
+        if name == b'PING':
+            self.send(b'+PONG\r\n')
+        elif name in (b'CLIENT', b'SELECT'):
+            self.send(b'+OK\r\n')
+        elif name == b'PSUBSCRIBE':
+            for pattern in args:
+                self.patterns.add(pattern)
+                self.server.subscribe(self, pattern)
+                self.send(array(bulk(b'psubscribe'), bulk(pattern),
+                                b':%d\r\n' % len(self.patterns)))
+        elif name == b'PUNSUBSCRIBE':
+            patterns = args or list(self.patterns)
+            self.server.unsubscribe(self, patterns)
+            for pattern in patterns:
+                self.patterns.discard(pattern)
+                self.send(array(bulk(b'punsubscribe'), bulk(pattern),
+                                b':%d\r\n' % len(self.patterns)))
+        elif name == b'PUBLISH' and len(args) == 2:
+            receivers = self.server.publish(args[0], args[1])
+            self.send(b':%d\r\n' % receivers)
+        else:
+            self.send(b'-ERR unknown command\r\n')
+
+
+class PubSubServer(socketserver.ThreadingTCPServer):
+    """
+    A Redis stand-in implementing PSUBSCRIBE, PUNSUBSCRIBE and PUBLISH.
+    """
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, port: int) -> None:
+        """
+        Initializes the server.
+
+        Args:
+            port (int): The port to listen on.
+        """
+        super().__init__(('127.0.0.1', port), PubSubHandler)
+        self.lock = threading.Lock()
+        self.subscriptions: Dict[bytes, Set[PubSubHandler]] = {}
+
+    def subscribe(self, handler: PubSubHandler, pattern: bytes) -> None:
+        """
+        Subscribes a connection to a channel pattern.
+
+        Args:
+            handler (PubSubHandler): The connection.
+            pattern (bytes): The glob-style pattern.
+        """
+        with self.lock:
+            self.subscriptions.setdefault(pattern, set()).add(handler)
+
+    def unsubscribe(self, handler: PubSubHandler,
+                    patterns: Iterable[bytes]) -> None:
+        """
+        Removes a connection's subscriptions.
+
+        Args:
+            handler (PubSubHandler): The connection.
+            patterns (Iterable[bytes]): The patterns to unsubscribe from.
+        """
+        with self.lock:
+            for pattern in patterns:
+                self.subscriptions.get(pattern, set()).discard(handler)
+
+    def publish(self, channel: bytes, message: bytes) -> int:
+        """
+        Delivers a message to every connection subscribed to a matching
+        pattern.
+
+        Args:
+            channel (bytes): The channel.
+            message (bytes): The message.
+
+        Returns:
+            int: The number of deliveries.
+        """
+        with self.lock:
+            targets = [
+                (pattern, handler)
+                for pattern, handlers in self.subscriptions.items()
+                if fnmatch.fnmatchcase(channel, pattern)
+                for handler in handlers
+            ]
+        for pattern, handler in targets:
+            try:
+                handler.send(array(bulk(b'pmessage'), bulk(pattern),
+                                   bulk(channel), bulk(message)))
+            except OSError:
+                pass
+        return len(targets)
+
+
+def poll(port: int, channels: str, received: List[float],
+         lock: threading.Lock) -> None:
+    """
+    Sends one channel long poll and records when it returned a message.
+
+    Args:
+        port (int): The worker's port.
+        channels (str): The comma-separated channels to wait on.
+        received (List[float]): Where to append the time.perf_counter()
+        value at which the response arrived.
+        lock (threading.Lock): Protects `received`.
+    """
+    conn = http.client.HTTPConnection('127.0.0.1', port, timeout=60)
+    conn.request('GET', f'/api/poll?channels={channels}')
+    body = json.loads(conn.getresponse().read())
+    now: float = time.perf_counter()
+    conn.close()
+    if 'messages' not in body:
+        raise RuntimeError(f'poll returned without a message: {body}')
+    with lock:
+        received.append(now)
+
+
+def publish(port: int, channel: str) -> int:
+    """
+    Publishes a message through a worker.
+
+    Args:
+        port (int): The worker's port.
+        channel (str): The channel.
+
+    Returns:
+        int: The number of processes subscribed.
+    """
+    conn = http.client.HTTPConnection('127.0.0.1', port, timeout=10)
+    conn.request('POST', f'/api/publish/{channel}',
+                 body=json.dumps({'sent_at': time.time()}),
+                 headers={'Content-Type': 'application/json'})
+    receivers: int = json.loads(conn.getresponse().read())['receivers']
+    conn.close()
+    return receivers
+
+
+def run_round(ports: List[int], number: int, pollers: int,
+              settle: float) -> Dict[str, List[float]]:
+    """
+    Parks pollers on both workers and publishes through the second.
+
+    Args:
+        ports (List[int]): The ports of the two workers.
+        number (int): The round number, which names its channel.
+        pollers (int): Polls parked on each worker.
+        settle (float): Seconds to let the polls park before publishing.
+
+    Returns:
+        Dict[str, List[float]]: Wake-up latencies in seconds, keyed by
+        'other worker' and 'same worker'.
+    """
+    channel = f'bench-{number}'
+    lock = threading.Lock()
+    received: Dict[str, List[float]] = {'other worker': [],
+                                        'same worker': []}
+    threads = [
+        threading.Thread(target=poll, args=(
+            port, f'idle,{channel}', received[label], lock))
+        for port, label in zip(ports, received)
+        for _ in range(pollers)
+    ]
+    for thread in threads:
+        thread.start()
+    time.sleep(settle)
+    published: float = time.perf_counter()
+    if publish(ports[1], channel) != 2:
+        raise SystemExit('both workers should be subscribed')
+    for thread in threads:
+        thread.join()
+    return {label: [now - published for now in times]
+            for label, times in received.items()}
+
+
+def main() -> None:
+    """
+    Parses arguments, starts the stand-in and two workers, and reports the
+    wake-up latencies.
+    """
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('--rounds', type=int, default=50)
+    parser.add_argument('--pollers', type=int, default=10,
+                        help='polls parked on each worker per round')
+    parser.add_argument('--settle', type=float, default=0.2,
+                        help='seconds to let the polls park before '
+                             'publishing')
+    parser.add_argument('--model', default='threaded',
+                        help='serve.py model of the workers')
+    args = parser.parse_args()
+
+    pubsub = PubSubServer(free_port())
+    threading.Thread(target=pubsub.serve_forever, daemon=True).start()
+    env = dict(
+        os.environ,
+        REDIS_URL=f'redis://127.0.0.1:{pubsub.server_address[1]}/0',
+        STATS_LOG_INTERVAL='0',
+    )
+    ports = [free_port(), free_port()]
+    processes = [start_app('longpoll', port, env, args.model, 1)
+                 for port in ports]
+    try:
+        # Subscribe both workers before measuring.
+        run_round(ports, -1, 1, 1.0)
+        results: Dict[str, List[float]] = {}
+        for number in range(args.rounds):
+            for label, values in run_round(
+                    ports, number, args.pollers, args.settle).items():
+                results.setdefault(label, []).extend(values)
+    finally:
+        for process in processes:
+            process.terminate()
+            process.wait()
+
+    print(f'{args.rounds} rounds, {args.pollers} polls per worker, '
+          f'{args.model} model')
+    print(f'{"polls on":<14} {"p50 ms":>10} {"p99 ms":>10} {"max ms":>10}')
+    for label, values in results.items():
+        values.sort()
+        p50, p99 = percentile(values, 50), percentile(values, 99)
+        print(f'{label:<14} {p50 * 1000:>10.2f} {p99 * 1000:>10.2f} '
+              f'{values[-1] * 1000:>10.2f}')
+
+
+if __name__ == '__main__':
+    main()
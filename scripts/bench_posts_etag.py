@@ -0,0 +1,97 @@
+"""
+bench_posts_etag.py: Micro-benchmark of GET /api/posts in corsapp.py.
+
+Measures requests per second through the Flask test client for four cases:
+a cold body (the payload is re-serialized on every request), a cached body,
+a cached body sent gzip-compressed, and a conditional request answered with
+304 Not Modified.
+
+Usage:
+    python scripts/bench_posts_etag.py [--requests N] [--posts N]
+"""
+
+import argparse
+import os
+import sys
+import time
+from typing import Callable
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+import corsapp  # noqa: E402
+from posts_store import InMemoryPostsStore  # noqa: E402
+
+
+def measure(name: str, requests: int, send: Callable[[], int],
+            expected_status: int) -> float:
+    """
+    Sends a number of requests and reports the achieved rate.
+
+    Args:
+        name (str): Label printed next to the result.
+        requests (int): Number of requests to send.
+        send (Callable[[], int]): Sends one request and returns its status.
+        expected_status (int): The status every request must return.
+
+    Returns:
+        float: Requests per second.
+    """
+    start: float = time.perf_counter()
+    for _ in range(requests):
+        status = send()
+        if status != expected_status:
+            raise SystemExit(f'{name}: expected {expected_status}, '
+                             f'got {status}')
+    elapsed: float = time.perf_counter() - start
+    rate: float = requests / elapsed
+    print(f'{name:<12} {rate:>10.0f} req/s')
+    return rate
+
+
+def main() -> None:
+    """
+    Parses arguments, fills an in-memory posts store and runs the four
+    cases.
+    """
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('--requests', type=int, default=5000)
+    parser.add_argument('--posts', type=int, default=100)
+    args = parser.parse_args()
+
+    store = InMemoryPostsStore({
+        str(i): {'post': f'This is blog post number {i}.'}
+        for i in range(args.posts)
+    })
+    corsapp.posts_store = store
+    client = corsapp.app.test_client()
+    url: str = f'/api/posts?limit={args.posts}'
+
+    def cold() -> int:
+        # Touch the store so the cached page is rebuilt
+        store.put('0', {'post': 'This is blog post number 0.'})
+        return client.get(url).status_code
+
+    def cached() -> int:
+        return client.get(url).status_code
+
+    def cached_gzip() -> int:
+        return client.get(
+            url, headers={'Accept-Encoding': 'gzip'}
+        ).status_code
+
+    etag: str = corsapp.posts_page(None, args.posts)[2]
+
+    def not_modified() -> int:
+        return client.get(
+            url, headers={'If-None-Match': f'"{etag}"'}
+        ).status_code
+
+    print(f'{args.requests} requests, {args.posts} posts')
+    measure('cold', args.requests, cold, 200)
+    measure('cached', args.requests, cached, 200)
+    measure('cached gzip', args.requests, cached_gzip, 200)
+    measure('304', args.requests, not_modified, 304)
+
+
+if __name__ == '__main__':
+    main()
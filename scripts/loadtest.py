@@ -0,0 +1,442 @@
+"""
+loadtest.py: Throughput and latency benchmark for the services.
+
+Starts local Stripe and GitHub stubs, launches each service under test in
+its own process (pointed at the stubs), and drives it with a fixed number of
+concurrent keep-alive clients for a fixed duration. The results (requests
+per second, p50/p99/p99.9 latency and error rate per endpoint) are printed
+and written as JSON, which can be compared against an earlier run.
+
+Services can be launched with the Flask development server or with
+serve.py under one or more concurrency models, to compare the models on the
+same endpoint in one report.
+
+All load comes from a single client address, so per-client rate limiting
+is disabled unless --rate-limit is given. --max-concurrent sets the number
+of requests each service process serves at once on its guarded endpoints
+before shedding load with 503.
+
+Usage:
+    python scripts/loadtest.py [--scenarios posts,create_charge,...]
+        [--concurrency N] [--duration S] [--output report.json]
+        [--servers flask,threaded,gevent,asgi] [--workers N]
+        [--rate-limit] [--max-concurrent N] [--compare previous.json]
+"""
+
+import argparse
+import hashlib
+import hmac
+import http.client
+import json
+import os
+import platform
+import socket
+import subprocess
+import sys
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+ROOT: str = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from stubs import start_stubs  # noqa: E402
+
+WEBHOOK_SECRET: str = 'whsec_loadtest'
+
+WEBHOOK_EVENT: bytes = json.dumps({
+    'id': 'evt_loadtest',
+    'object': 'event',
+    'type': 'payment_intent.succeeded',
+    'data': {'object': {'id': 'pi_loadtest', 'object': 'payment_intent',
+                        'amount': 2000, 'currency': 'usd'}},
+}).encode()
+
+
+def sign_webhook(payload: bytes) -> Dict[str, str]:
+    """
+    Signs a webhook payload the way Stripe does.
+
+    Args:
+        payload (bytes): The raw request body.
+
+    Returns:
+        Dict[str, str]: The request headers, including Stripe-Signature.
+    """
+    timestamp = int(time.time())
+    signature = hmac.new(WEBHOOK_SECRET.encode(),
+                         f'{timestamp}.'.encode() + payload,
+                         hashlib.sha256).hexdigest()
+    return {'Content-Type': 'application/json',
+            'Stripe-Signature': f't={timestamp},v1={signature}'}
+
+
+class Scenario:
+    """
+    An endpoint to load test and how to call it.
+
+    Attributes:
+        app (str): Module of the Flask app serving the endpoint.
+        method (str): The HTTP method.
+        path (str): The request path.
+        body (Optional[bytes]): The request body.
+        headers (Callable[[], Dict[str, str]]): Builds the request headers.
+        expected_status (int): The status code of a successful request.
+        stream (bool): Whether the response is an endless event stream; the
+        latency of a streamed request is the time to its first event.
+        worker (bool): Whether the endpoint needs a Celery worker.
+    """
+
+    def __init__(self, app: str, method: str, path: str,
+                 body: Optional[bytes] = None,
+                 headers: Optional[Callable[[], Dict[str, str]]] = None,
+                 expected_status: int = 200, stream: bool = False,
+                 worker: bool = False) -> None:
+        self.app: str = app
+        self.method: str = method
+        self.path: str = path
+        self.body: Optional[bytes] = body
+        self.headers: Callable[[], Dict[str, str]] = headers or dict
+        self.expected_status: int = expected_status
+        self.stream: bool = stream
+        self.worker: bool = worker
+
+
+SCENARIOS: Dict[str, Scenario] = {
+    'create_charge': Scenario(
+        'sync', 'POST', '/api/create_charge',
+        body=json.dumps({'token': 'tok_visa', 'amount': 2000,
+                         'currency': 'usd'}).encode(),
+        headers=lambda: {'Content-Type': 'application/json'}),
+    'webhook': Scenario(
+        'webhook', 'POST', '/api/webhook', body=WEBHOOK_EVENT,
+        headers=lambda: sign_webhook(WEBHOOK_EVENT)),
+    'poll': Scenario('longpoll', 'GET', '/api/poll'),
+    'events': Scenario('sse', 'GET', '/events', stream=True),
+    'posts': Scenario('corsapp', 'GET', '/api/posts'),
+    'fetch_github_data': Scenario(
+        'taskapp', 'GET', '/api/fetch-github-data', worker=True),
+}
+
+
+def free_port() -> int:
+    """
+    Returns a TCP port that is currently free on the loopback interface.
+
+    Returns:
+        int: The port number.
+    """
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        port: int = sock.getsockname()[1]
+        return port
+
+
+def wait_for_port(port: int, process: subprocess.Popen,  # type: ignore
+                  timeout: float = 30.0) -> None:
+    """
+    Waits until a server accepts connections.
+
+    Args:
+        port (int): The port the server listens on.
+        process (subprocess.Popen): The server process.
+        timeout (float): Seconds to wait before giving up.
+
+    Raises:
+        RuntimeError: If the process exits or the port never opens.
+    """
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f'server exited with {process.returncode}')
+        try:
+            socket.create_connection(('127.0.0.1', port), 0.5).close()
+            return
+        except OSError:
+            time.sleep(0.1)
+    raise RuntimeError(f'server did not open port {port}')
+
+
+def start_app(module: str, port: int, env: Dict[str, str], server: str,
+              workers: Optional[int]) -> subprocess.Popen:  # type: ignore
+    """
+    Launches a service, either with the Flask development server or with
+    serve.py under one of its concurrency models.
+
+    Args:
+        module (str): Module of the Flask app.
+        port (int): The port to listen on.
+        env (Dict[str, str]): Environment of the server process.
+        server (str): 'flask' or a serve.py model.
+        workers (Optional[int]): Worker processes for serve.py, or None for
+        its default.
+
+    Returns:
+        subprocess.Popen: The server process, once it accepts connections.
+    """
+    if server == 'flask':
+        command = [sys.executable, '-m', 'flask', '--app', module, 'run',
+                   '--port', str(port), '--with-threads']
+    else:
+        command = [sys.executable, 'serve.py', module, '--model', server,
+                   '--port', str(port), '--graceful-timeout', '1']
+        if workers is not None:
+            command += ['--workers', str(workers)]
+    process = subprocess.Popen(
+        command, cwd=ROOT, env=env,
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    wait_for_port(port, process)
+    return process
+
+
+def start_worker(env: Dict[str, str]) -> subprocess.Popen:  # type: ignore
+    """
+    Launches a Celery worker for the task queue service.
+
+    Args:
+        env (Dict[str, str]): Environment of the worker process.
+
+    Returns:
+        subprocess.Popen: The worker process.
+    """
+    return subprocess.Popen(
+        [sys.executable, '-m', 'celery', '-A', 'taskapp.celery', 'worker',
+         '--loglevel=WARNING'],
+        cwd=ROOT, env=env,
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+
+def send(conn: http.client.HTTPConnection,
+         scenario: Scenario) -> Tuple[int, bool]:
+    """
+    Sends one request and reads its response.
+
+    Args:
+        conn (http.client.HTTPConnection): The client connection.
+        scenario (Scenario): The endpoint to call.
+
+    Returns:
+        Tuple[int, bool]: The status code, and whether the connection can be
+        reused.
+    """
+    conn.request(scenario.method, scenario.path, body=scenario.body,
+                 headers=scenario.headers())
+    response = conn.getresponse()
+    if not scenario.stream:
+        response.read()
+        return response.status, not response.will_close
+    # Read up to the end of the first event, then drop the stream.
+    while response.readline() not in (b'\n', b'\r\n', b''):
+        pass
+    return response.status, False
+
+
+def percentile(values: List[float], q: float) -> Optional[float]:
+    """
+    Returns the nearest-rank percentile of sorted values.
+
+    Args:
+        values (List[float]): The values, sorted ascending.
+        q (float): The percentile, between 0 and 100.
+
+    Returns:
+        Optional[float]: The percentile, or None if there are no values.
+    """
+    if not values:
+        return None
+    rank = max(int(-(-q * len(values) // 100)), 1)
+    return values[rank - 1]
+
+
+def run_load(port: int, scenario: Scenario, concurrency: int,
+             duration: float, timeout: float) -> Dict[str, Any]:
+    """
+    Drives an endpoint with concurrent clients and summarizes the results.
+
+    Args:
+        port (int): The port the service listens on.
+        scenario (Scenario): The endpoint to call.
+        concurrency (int): Number of concurrent clients.
+        duration (float): Seconds to keep sending requests.
+        timeout (float): Per-request timeout in seconds.
+
+    Returns:
+        Dict[str, Any]: Request count, error rate, throughput, latency
+        percentiles in milliseconds and status code counts.
+    """
+    latencies: List[float] = []
+    statuses: Dict[str, int] = {}
+    lock = threading.Lock()
+    deadline = time.perf_counter() + duration
+
+    def client() -> None:
+        local_latencies: List[float] = []
+        local_statuses: Dict[str, int] = {}
+        conn: Optional[http.client.HTTPConnection] = None
+        while time.perf_counter() < deadline:
+            if conn is None:
+                conn = http.client.HTTPConnection('127.0.0.1', port,
+                                                  timeout=timeout)
+            start = time.perf_counter()
+            try:
+                status, reusable = send(conn, scenario)
+                key = str(status)
+            except (OSError, http.client.HTTPException) as exc:
+                reusable = False
+                key = type(exc).__name__
+            local_latencies.append(time.perf_counter() - start)
+            local_statuses[key] = local_statuses.get(key, 0) + 1
+            if not reusable:
+                conn.close()
+                conn = None
+        if conn is not None:
+            conn.close()
+        with lock:
+            latencies.extend(local_latencies)
+            for key, count in local_statuses.items():
+                statuses[key] = statuses.get(key, 0) + count
+
+    started = time.perf_counter()
+    clients = [threading.Thread(target=client) for _ in range(concurrency)]
+    for thread in clients:
+        thread.start()
+    for thread in clients:
+        thread.join()
+    elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    requests = len(latencies)
+    errors = requests - statuses.get(str(scenario.expected_status), 0)
+
+    def ms(value: Optional[float]) -> Optional[float]:
+        return None if value is None else round(value * 1000, 3)
+
+    return {
+        'requests': requests,
+        'errors': errors,
+        'error_rate': errors / requests if requests else 0.0,
+        'rps': requests / elapsed,
+        'latency_ms': {
+            'p50': ms(percentile(latencies, 50)),
+            'p99': ms(percentile(latencies, 99)),
+            'p99.9': ms(percentile(latencies, 99.9)),
+            'max': ms(latencies[-1] if latencies else None),
+        },
+        'statuses': statuses,
+    }
+
+
+def compare(report: Dict[str, Any], previous: Dict[str, Any]) -> None:
+    """
+    Prints the change in throughput and p99 latency against a previous run.
+
+    Args:
+        report (Dict[str, Any]): The current report.
+        previous (Dict[str, Any]): The report to compare against.
+    """
+    def change(new: Optional[float], old: Optional[float]) -> str:
+        if not new or not old:
+            return 'n/a'
+        return f'{(new - old) / old * 100:+.1f}%'
+
+    print(f'\n{"vs previous":<20} {"rps":>10} {"p99":>10}')
+    for name, result in report['scenarios'].items():
+        old = previous.get('scenarios', {}).get(name)
+        if old is None:
+            continue
+        rps = change(result['rps'], old['rps'])
+        p99 = change(result['latency_ms']['p99'], old['latency_ms']['p99'])
+        print(f'{name:<20} {rps:>10} {p99:>10}')
+
+
+def main() -> None:
+    """
+    Parses arguments, runs the selected scenarios and writes the report.
+    """
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('--scenarios', default=','.join(SCENARIOS))
+    parser.add_argument('--concurrency', type=int, default=16)
+    parser.add_argument('--duration', type=float, default=10.0)
+    parser.add_argument('--timeout', type=float, default=60.0)
+    parser.add_argument('--upstream-delay', type=float, default=0.0,
+                        help='seconds the stubs wait before answering')
+    parser.add_argument('--servers', default='flask',
+                        help='comma-separated servers to compare: flask '
+                             '(development server) or a serve.py model '
+                             '(threaded, gevent, asgi)')
+    parser.add_argument('--workers', type=int, default=None,
+                        help='worker processes for serve.py models')
+    parser.add_argument('--rate-limit', action='store_true',
+                        help='keep per-client rate limiting enabled')
+    parser.add_argument('--max-concurrent', type=int, default=None,
+                        help='requests each service process serves at once '
+                             'before shedding load (0 for no limit)')
+    parser.add_argument('--output', default='loadtest-report.json')
+    parser.add_argument('--compare', help='previous report to compare with')
+    args = parser.parse_args()
+
+    stripe, github = start_stubs(args.upstream_delay)
+    env = dict(
+        os.environ,
+        STRIPE_API_KEY='sk_test_loadtest',
+        STRIPE_WEBHOOK_SECRET=WEBHOOK_SECRET,
+        STRIPE_API_BASE=f'http://127.0.0.1:{stripe.server_address[1]}',
+        GITHUB_API_BASE=f'http://127.0.0.1:{github.server_address[1]}',
+    )
+    if not args.rate_limit:
+        env['RATELIMIT_RATE'] = '0'
+    if args.max_concurrent is not None:
+        env['RATELIMIT_MAX_CONCURRENT'] = str(args.max_concurrent)
+
+    report: Dict[str, Any] = {
+        'meta': {
+            'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'cpus': os.cpu_count(),
+            'concurrency': args.concurrency,
+            'duration_s': args.duration,
+            'upstream_delay_s': args.upstream_delay,
+            'servers': args.servers.split(','),
+            'workers': args.workers,
+            'rate_limit': args.rate_limit,
+            'max_concurrent': args.max_concurrent,
+        },
+        'scenarios': {},
+    }
+    print(f'{"scenario":<20} {"rps":>10} {"p50 ms":>10} {"p99 ms":>10} '
+          f'{"p99.9 ms":>10} {"errors":>8}')
+    servers: List[str] = args.servers.split(',')
+    for name in args.scenarios.split(','):
+        for server in servers:
+            scenario = SCENARIOS[name]
+            # Results are keyed by scenario alone unless servers are compared.
+            key = name if len(servers) == 1 else f'{name}@{server}'
+            port = free_port()
+            processes = [start_app(scenario.app, port, env, server,
+                                   args.workers)]
+            if scenario.worker:
+                processes.append(start_worker(env))
+            try:
+                result = run_load(port, scenario, args.concurrency,
+                                  args.duration, args.timeout)
+            finally:
+                for process in processes:
+                    process.terminate()
+                    process.wait()
+            report['scenarios'][key] = result
+            latency = result['latency_ms']
+            print(f'{key:<20} {result["rps"]:>10.1f} '
+                  f'{latency["p50"]!s:>10} {latency["p99"]!s:>10} '
+                  f'{latency["p99.9"]!s:>10} {result["error_rate"]:>8.2%}')
+
+    with open(args.output, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f'\nReport written to {args.output}')
+    if args.compare:
+        with open(args.compare) as f:
+            compare(report, json.load(f))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,178 @@
+"""
+stress_posts_store.py: Concurrency stress test for the posts stores.
+
+For each backend, a pool of threads concurrently creates posts, deletes
+posts (several threads racing to delete the same ids) and walks the
+collection page by page. The run fails if a post is deleted twice, a page is
+out of order or repeats an id, or the final contents do not match what the
+writers did. It then reports the latency of reading a page from the middle
+of a large collection.
+
+Usage:
+    python scripts/stress_posts_store.py [--threads N] [--posts N]
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import threading
+import time
+from typing import Callable, Dict, List
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from posts_store import (  # noqa: E402
+    InMemoryPostsStore, PostsStore, SQLitePostsStore
+)
+
+
+def post_id(i: int) -> str:
+    """
+    Returns a zero-padded post id, so that ids sort numerically.
+
+    Args:
+        i (int): The post number.
+
+    Returns:
+        str: The post id.
+    """
+    return f'{i:08d}'
+
+
+def check_pages(store: PostsStore, limit: int) -> int:
+    """
+    Walks all pages of the store and checks that ids strictly increase.
+
+    Args:
+        store (PostsStore): The store to walk.
+        limit (int): The page size.
+
+    Returns:
+        int: The number of posts seen.
+    """
+    seen: int = 0
+    last: str = ''
+    cursor = None
+    while True:
+        posts, cursor = store.list(cursor, limit)
+        for key in posts:
+            if key <= last:
+                raise AssertionError(f'page out of order: {key} <= {last}')
+            last = key
+        seen += len(posts)
+        if cursor is None:
+            return seen
+
+
+def stress(name: str, store: PostsStore, threads: int, posts: int) -> None:
+    """
+    Runs the concurrent workload against one store and checks the outcome.
+
+    Args:
+        name (str): Label printed next to the result.
+        store (PostsStore): The store to exercise.
+        threads (int): Number of threads per role.
+        posts (int): Number of posts created per writer thread.
+    """
+    for i in range(posts):
+        store.put(post_id(i), {'post': f'Seed post {i}.'})
+    version: int = store.version()
+
+    deleted: Dict[str, int] = {}
+    deleted_lock = threading.Lock()
+    errors: List[BaseException] = []
+    barrier = threading.Barrier(threads * 3)
+
+    def run(target: Callable[[int], None], n: int) -> None:
+        try:
+            barrier.wait()
+            target(n)
+        except BaseException as exc:
+            errors.append(exc)
+
+    def writer(n: int) -> None:
+        for i in range(posts):
+            number = posts * (n + 1) + i
+            store.put(post_id(number), {'post': f'Post {number}.'})
+
+    def deleter(n: int) -> None:
+        # Every deleter races for the same seeded ids.
+        for i in range(posts):
+            if store.delete(post_id(i)):
+                with deleted_lock:
+                    deleted[post_id(i)] = deleted.get(post_id(i), 0) + 1
+
+    def reader(n: int) -> None:
+        for _ in range(5):
+            check_pages(store, 50)
+
+    workers = [
+        threading.Thread(target=run, args=(target, n))
+        for target in (writer, deleter, reader)
+        for n in range(threads)
+    ]
+    start = time.perf_counter()
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    elapsed = time.perf_counter() - start
+
+    if errors:
+        raise errors[0]
+    if len(deleted) != posts or any(c != 1 for c in deleted.values()):
+        raise AssertionError('seeded posts were not each deleted exactly once')
+    remaining = check_pages(store, 1000)
+    if remaining != posts * threads:
+        raise AssertionError(f'expected {posts * threads} posts, '
+                             f'found {remaining}')
+    if store.version() <= version:
+        raise AssertionError('version did not change after mutations')
+    print(f'{name:<8} ok in {elapsed:.2f}s '
+          f'({threads} writers, {threads} deleters, {threads} readers)')
+
+
+def page_latency(name: str, store: PostsStore, size: int) -> None:
+    """
+    Fills a store and reports the latency of reading a 100-post page from
+    the middle of it.
+
+    Args:
+        name (str): Label printed next to the result.
+        store (PostsStore): An empty store.
+        size (int): Number of posts to fill the store with.
+    """
+    for i in range(size):
+        store.put(post_id(i), {'post': f'Post {i}.'})
+    rounds: int = 200
+    start = time.perf_counter()
+    for _ in range(rounds):
+        store.list(post_id(size // 2), 100)
+    elapsed = (time.perf_counter() - start) / rounds
+    print(f'{name:<8} {elapsed * 1e6:>8.0f} us per page of 100 '
+          f'out of {size} posts')
+
+
+def main() -> None:
+    """
+    Parses arguments and runs the stress test against every backend.
+    """
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('--threads', type=int, default=8)
+    parser.add_argument('--posts', type=int, default=500)
+    parser.add_argument('--large', type=int, default=100000,
+                        help='collection size for the page latency check')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        stress('memory', InMemoryPostsStore(), args.threads, args.posts)
+        stress('sqlite', SQLitePostsStore(os.path.join(tmp, 'stress.db')),
+               args.threads, args.posts)
+        page_latency('memory', InMemoryPostsStore(), args.large)
+        page_latency('sqlite', SQLitePostsStore(os.path.join(tmp, 'big.db')),
+                     args.large)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,281 @@
+"""
+stubs.py: Local stand-ins for the Stripe and GitHub APIs.
+
+The stubs answer the requests the services make upstream with realistic
+payloads, so the services can be load tested without network access or
+API keys. An optional delay simulates upstream latency.
+
+Usage:
+    python scripts/stubs.py [--stripe-port N] [--github-port N] [--delay S]
+"""
+
+import argparse
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Tuple
+from urllib.parse import parse_qs
+
+
+def charge(charge_id: str, amount: int, currency: str) -> Dict[str, Any]:
+    """
+    Builds a charge object shaped like the one returned by the Stripe API.
+
+    Args:
+        charge_id (str): The charge ID.
+        amount (int): The charged amount.
+        currency (str): The currency of the charge.
+
+    Returns:
+        Dict[str, Any]: The charge.
+    """
+    return {
+        'id': charge_id,
+        'object': 'charge',
+        'amount': amount,
+        'amount_captured': amount,
+        'amount_refunded': 0,
+        'application': None,
+        'application_fee': None,
+        'application_fee_amount': None,
+        'balance_transaction': 'txn_3MmlLrLkdIwHu7ix0uke3Ezy',
+        'billing_details': {
+            'address': {
+                'city': None, 'country': None, 'line1': None,
+                'line2': None, 'postal_code': None, 'state': None,
+            },
+            'email': None,
+            'name': None,
+            'phone': None,
+        },
+        'calculated_statement_descriptor': 'Stripe',
+        'captured': True,
+        'created': int(time.time()),
+        'currency': currency,
+        'customer': None,
+        'description': 'My First Test Charge (created for API docs)',
+        'disputed': False,
+        'failure_balance_transaction': None,
+        'failure_code': None,
+        'failure_message': None,
+        'fraud_details': {},
+        'invoice': None,
+        'livemode': False,
+        'metadata': {},
+        'on_behalf_of': None,
+        'outcome': {
+            'network_status': 'approved_by_network',
+            'reason': None,
+            'risk_level': 'normal',
+            'risk_score': 32,
+            'seller_message': 'Payment complete.',
+            'type': 'authorized',
+        },
+        'paid': True,
+        'payment_intent': None,
+        'payment_method': 'card_1MmlLrLkdIwHu7ixIJwEWSNR',
+        'payment_method_details': {
+            'card': {
+                'brand': 'visa',
+                'checks': {
+                    'address_line1_check': None,
+                    'address_postal_code_check': None,
+                    'cvc_check': 'pass',
+                },
+                'country': 'US',
+                'exp_month': 3,
+                'exp_year': 2030,
+                'fingerprint': 'mToisGZ01V71BCos',
+                'funding': 'credit',
+                'installments': None,
+                'last4': '4242',
+                'mandate': None,
+                'network': 'visa',
+                'three_d_secure': None,
+                'wallet': None,
+            },
+            'type': 'card',
+        },
+        'receipt_email': None,
+        'receipt_number': None,
+        'receipt_url': ('https://pay.stripe.com/receipts/payment/'
+                        'CAcaFwoVYWNjdF8xTTJKVGtMa2RJd0h1N2l4KOvG06AGMgZfBXy'
+                        'r1aw6LBa9vaaSRWU96d8qBwz9z2J_CObiV_H2-e8RezSK_sw0KI'
+                        'SY3EIsA'),
+        'refunded': False,
+        'review': None,
+        'shipping': None,
+        'source_transfer': None,
+        'statement_descriptor': None,
+        'statement_descriptor_suffix': None,
+        'status': 'succeeded',
+        'transfer_data': None,
+        'transfer_group': None,
+    }
+
+
+def repositories(count: int) -> List[Dict[str, Any]]:
+    """
+    Builds repository items shaped like the GitHub search API results.
+
+    Args:
+        count (int): Number of repositories.
+
+    Returns:
+        List[Dict[str, Any]]: The repositories, most starred first.
+    """
+    items: List[Dict[str, Any]] = []
+    for i in range(count):
+        name = f'repo-{i}'
+        owner = f'owner-{i}'
+        url = f'https://api.github.com/repos/{owner}/{name}'
+        items.append({
+            'id': 1000 + i,
+            'node_id': f'MDEwOlJlcG9zaXRvcnl7{i:05d}',
+            'name': name,
+            'full_name': f'{owner}/{name}',
+            'private': False,
+            'owner': {
+                'login': owner,
+                'id': 2000 + i,
+                'avatar_url': f'https://avatars.githubusercontent.com/u/{i}',
+                'url': f'https://api.github.com/users/{owner}',
+                'type': 'Organization',
+                'site_admin': False,
+            },
+            'html_url': f'https://github.com/{owner}/{name}',
+            'description': f'Description of repository number {i}.',
+            'fork': False,
+            'url': url,
+            'created_at': '2014-01-01T00:00:00Z',
+            'updated_at': '2024-01-01T00:00:00Z',
+            'pushed_at': '2024-01-01T00:00:00Z',
+            'homepage': f'https://{name}.example.com',
+            'size': 100000 - i,
+            'stargazers_count': 400000 - i * 1000,
+            'watchers_count': 400000 - i * 1000,
+            'language': 'Python',
+            'forks_count': 50000 - i * 100,
+            'open_issues_count': 100 + i,
+            'license': {'key': 'mit', 'name': 'MIT License'},
+            'topics': ['example', 'benchmark', f'topic-{i % 10}'],
+            'default_branch': 'main',
+            'score': 1.0,
+        })
+    return items
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    """
+    Serves the Stripe charge endpoint and the GitHub repository search.
+    """
+    protocol_version = 'HTTP/1.1'
+    delay: float = 0.0
+    charge_count: int = 0
+    count_lock = threading.Lock()
+
+    def send_json(self, status: int, payload: Any) -> None:
+        """
+        Writes a JSON response.
+
+        Args:
+            status (int): The HTTP status code.
+            payload (Any): The JSON payload.
+        """
+        body = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_POST(self) -> None:
+        length = int(self.headers.get('Content-Length', 0))
+        form = parse_qs(self.rfile.read(length).decode())
+        if self.delay:
+            time.sleep(self.delay)
+        if self.path != '/v1/charges':
+            self.send_json(404, {'error': {'message': 'Not found'}})
+            return
+        with StubHandler.count_lock:
+            StubHandler.charge_count += 1
+            number = StubHandler.charge_count
+        self.send_json(200, charge(
+            f'ch_stub{number:016d}',
+            int(form.get('amount', ['0'])[0]),
+            form.get('currency', ['usd'])[0]))
+
+    def do_GET(self) -> None:
+        if self.delay:
+            time.sleep(self.delay)
+        if not self.path.startswith('/search/repositories'):
+            self.send_json(404, {'message': 'Not Found'})
+            return
+        items = repositories(100)
+        self.send_json(200, {
+            'total_count': len(items),
+            'incomplete_results': False,
+            'items': items,
+        })
+
+    def log_message(self, format: str, *args: Any) -> None:
+        pass
+
+
+def start_stub(port: int = 0, delay: float = 0.0) -> ThreadingHTTPServer:
+    """
+    Starts a stub server in a background thread.
+
+    Args:
+        port (int): Port to listen on, or 0 for any free port.
+        delay (float): Seconds to wait before answering each request.
+
+    Returns:
+        ThreadingHTTPServer: The running server; its port is
+        `server.server_address[1]`.
+    """
+    handler = type('DelayedStubHandler', (StubHandler,), {'delay': delay})
+    server = ThreadingHTTPServer(('127.0.0.1', port), handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def start_stubs(delay: float = 0.0) -> Tuple[ThreadingHTTPServer,
+                                             ThreadingHTTPServer]:
+    """
+    Starts the Stripe and GitHub stubs on free ports.
+
+    Args:
+        delay (float): Seconds to wait before answering each request.
+
+    Returns:
+        Tuple[ThreadingHTTPServer, ThreadingHTTPServer]: The Stripe stub and
+        the GitHub stub.
+    """
+    return start_stub(delay=delay), start_stub(delay=delay)
+
+
+def main() -> None:
+    """
+    Parses arguments and runs both stubs until interrupted.
+    """
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('--stripe-port', type=int, default=12111)
+    parser.add_argument('--github-port', type=int, default=12112)
+    parser.add_argument('--delay', type=float, default=0.0)
+    args = parser.parse_args()
+    stripe = start_stub(args.stripe_port, args.delay)
+    github = start_stub(args.github_port, args.delay)
+    print(f'Stripe stub: http://127.0.0.1:{stripe.server_address[1]}')
+    print(f'GitHub stub: http://127.0.0.1:{github.server_address[1]}')
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,433 @@
+"""
+serve.py: Production entry point that runs any of the Flask applications
+under a selectable concurrency model.
+
+A master process binds the listening socket and forks a pool of workers
+that share it. Each worker imports the application after the fork and
+serves it with one of these models:
+
+- threaded: a bounded pool of threads per worker (werkzeug's WSGI server).
+- gevent: cooperative green threads, with the standard library patched.
+- asgi: the application wrapped with asgiref's WsgiToAsgi, served by
+  uvicorn.
+
+The worker count defaults to the number of CPU cores available to the
+process. Sending SIGHUP to the master starts a fresh generation of workers
+(re-importing the application) and gracefully stops the old one; SIGTERM or
+SIGINT stops all workers gracefully.
+
+Usage:
+    python serve.py corsapp --model threaded --port 8000
+    python serve.py gateway --model gevent --workers 4
+"""
+
+import argparse
+import importlib
+import os
+import signal
+import socket
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional
+
+MODELS: List[str] = ['threaded', 'gevent', 'asgi']
+
+# Services built on Flask-SocketIO keep per-client session state in the
+# worker that accepted the handshake.
+SOCKETIO_APPS: List[str] = ['websockets', 'taskapp']
+
+
+def available_cores() -> int:
+    """
+    Determine the number of CPU cores this process may run on.
+
+    Returns:
+        int: The number of usable cores, at least 1.
+    """
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:
+        return os.cpu_count() or 1
+
+
+def load_app(target: str) -> Any:
+    """
+    Import a module and return its WSGI application.
+
+    Args:
+        target (str): Either `module` (using its `app` attribute) or
+        `module:attribute`.
+
+    Returns:
+        Any: The WSGI application.
+    """
+    module, _, attribute = target.partition(':')
+    return getattr(importlib.import_module(module), attribute or 'app')
+
+
+def serve_threaded(target: str, sock: socket.socket, threads: int,
+                   graceful_timeout: float, access_log: bool) -> None:
+    """
+    Serve the application with a bounded thread pool until SIGTERM.
+
+    Args:
+        target (str): The application to import.
+        sock (socket.socket): The shared listening socket.
+        threads (int): Number of threads handling connections.
+        graceful_timeout (float): Unused; in-flight requests are drained
+        until the master's deadline.
+        access_log (bool): Whether to log every request.
+    """
+    from werkzeug.serving import BaseWSGIServer, WSGIRequestHandler
+
+    class RequestHandler(WSGIRequestHandler):
+        def log_request(self, *args: Any, **kwargs: Any) -> None:
+            if access_log:
+                super().log_request(*args, **kwargs)
+
+    class PooledWSGIServer(BaseWSGIServer):
+        """
+        A WSGI server that hands connections to a fixed-size thread pool.
+
+        A connection is only accepted once a thread is free to serve it.
+        While every thread is held, e.g. by SSE streams or long polls, new
+        connections stay in the shared backlog for the other workers
+        instead of queueing behind those requests.
+        """
+        multithread = True
+
+        def __init__(self, *args: Any, **kwargs: Any) -> None:
+            self.pool = ThreadPoolExecutor(threads,
+                                           thread_name_prefix='request')
+            self.slots = threading.BoundedSemaphore(threads)
+            self.handed_off: bool = False
+            super().__init__(*args, **kwargs)
+
+        def _handle_request_noblock(self) -> None:
+            # Wait briefly, so serve_forever() still notices shutdown().
+            if not self.slots.acquire(timeout=0.5):
+                return
+            self.handed_off = False
+            try:
+                super()._handle_request_noblock()
+            finally:
+                # No connection was accepted, or it was not handed off.
+                if not self.handed_off:
+                    self.slots.release()
+
+        def process_request(self, request: Any, client_address: Any) -> None:
+            self.pool.submit(self.process_request_thread, request,
+                             client_address)
+            self.handed_off = True
+
+        def process_request_thread(self, request: Any,
+                                   client_address: Any) -> None:
+            try:
+                self.finish_request(request, client_address)
+            except Exception:
+                self.handle_error(request, client_address)
+            finally:
+                self.shutdown_request(request)
+                self.slots.release()
+
+    host, port = sock.getsockname()[:2]
+    server = PooledWSGIServer(host, port, load_app(target),
+                              handler=RequestHandler, fd=sock.fileno())
+
+    def stop(signum: int, frame: Any) -> None:
+        # shutdown() waits for serve_forever() to return, so it must not
+        # run on the thread that is serving.
+        threading.Thread(target=server.shutdown).start()
+
+    signal.signal(signal.SIGTERM, stop)
+    server.serve_forever()
+    server.server_close()
+    # Let in-flight requests finish before the worker exits.
+    server.pool.shutdown(wait=True)
+
+
+def serve_gevent(target: str, sock: socket.socket, threads: int,
+                 graceful_timeout: float, access_log: bool) -> None:
+    """
+    Serve the application with gevent green threads until SIGTERM.
+
+    Args:
+        target (str): The application to import.
+        sock (socket.socket): The shared listening socket.
+        threads (int): Maximum number of concurrent connections.
+        graceful_timeout (float): Seconds to let in-flight requests finish.
+        access_log (bool): Whether to log every request.
+    """
+    from gevent import monkey
+    monkey.patch_all()
+    import gevent
+    from gevent.pool import Pool
+    from gevent.pywsgi import WSGIServer
+
+    # Re-wrap the inherited descriptor in a cooperative socket.
+    listener = socket.socket(sock.family, sock.type, fileno=os.dup(
+        sock.fileno()))
+    server = WSGIServer(listener, load_app(target), spawn=Pool(threads),
+                        log='default' if access_log else None)
+    gevent.signal_handler(
+        signal.SIGTERM, lambda: gevent.spawn(server.stop, graceful_timeout))
+    server.serve_forever()
+
+
+def serve_asgi(target: str, sock: socket.socket, threads: int,
+               graceful_timeout: float, access_log: bool) -> None:
+    """
+    Serve the application through asgiref's WsgiToAsgi on uvicorn until
+    SIGTERM.
+
+    WsgiToAsgi cannot tell a WSGI application that its client went away, so
+    an endless stream (such as /events) keeps its thread after a disconnect
+    and the worker only exits at the master's graceful deadline.
+
+    Args:
+        target (str): The application to import.
+        sock (socket.socket): The shared listening socket.
+        threads (int): Number of threads running the WSGI application.
+        graceful_timeout (float): Seconds to let in-flight requests finish.
+        access_log (bool): Whether to log every request.
+    """
+    import uvicorn
+    from asgiref.sync import sync_to_async
+    from asgiref.wsgi import WsgiToAsgi, WsgiToAsgiInstance
+
+    executor = ThreadPoolExecutor(threads, thread_name_prefix='wsgi')
+
+    class PooledWsgiToAsgiInstance(WsgiToAsgiInstance):  # type: ignore
+        def call_wsgi_app(self, body: Any) -> None:
+            # asgiref's run_wsgi_app never closes the response iterable,
+            # as PEP 3333 requires, so its close() hooks (the request
+            # statistics, stream_with_context cleanup) would not run.
+            environ = self.build_environ(self.scope, body)
+            result = self.wsgi_application(environ, self.start_response)
+            try:
+                sent: int = 0
+                for output in result:
+                    if not self.response_started:
+                        self.response_started = True
+                        self.sync_send(self.response_start)
+                    length = self.response_content_length
+                    if length is not None:
+                        output = output[:length - sent]
+                    self.sync_send({'type': 'http.response.body',
+                                    'body': output, 'more_body': True})
+                    sent += len(output)
+                    if sent == length:
+                        break
+                if not self.response_started:
+                    self.response_started = True
+                    self.sync_send(self.response_start)
+                self.sync_send({'type': 'http.response.body'})
+            finally:
+                close = getattr(result, 'close', None)
+                if close is not None:
+                    close()
+
+        # asgiref runs WSGI calls on a single thread by default; run them
+        # on the pool instead so blocking views do not serialize.
+        run_wsgi_app = sync_to_async(
+            call_wsgi_app, thread_sensitive=False, executor=executor)
+
+    class PooledWsgiToAsgi(WsgiToAsgi):  # type: ignore
+        async def __call__(self, scope: Any, receive: Any,
+                           send: Any) -> None:
+            await PooledWsgiToAsgiInstance(self.wsgi_application)(
+                scope, receive, send)
+
+    # WSGI applications cannot accept WebSocket connections (and the
+    # websockets.py service shadows the package uvicorn would load).
+    config = uvicorn.Config(
+        PooledWsgiToAsgi(load_app(target)), lifespan='off', ws='none',
+        log_level='info' if access_log else 'warning',
+        access_log=access_log, timeout_graceful_shutdown=graceful_timeout)
+    uvicorn.Server(config).run(sockets=[sock])
+
+
+SERVERS: Dict[str, Callable[..., None]] = {
+    'threaded': serve_threaded,
+    'gevent': serve_gevent,
+    'asgi': serve_asgi,
+}
+
+
+class Master:
+    """
+    Forks the workers, restarts them if they die, and coordinates graceful
+    reloads and shutdowns.
+
+    Attributes:
+        workers (Dict[int, int]): Process ID -> generation of each worker.
+        generation (int): The current worker generation.
+    """
+
+    def __init__(self, args: argparse.Namespace,
+                 sock: socket.socket) -> None:
+        """
+        Initializes the master without starting any worker.
+
+        Parameters:
+            args (argparse.Namespace): The parsed command line.
+            sock (socket.socket): The shared listening socket.
+        """
+        self.args = args
+        self.sock = sock
+        self.workers: Dict[int, int] = {}
+        self.generation: int = 0
+        # Process ID -> deadline after which a stopping worker is killed.
+        self.stopping: Dict[int, float] = {}
+        self.reload_requested: bool = False
+        self.stop_requested: bool = False
+        # Workers are not respawned before this time after one has died.
+        self.respawn_after: float = 0.0
+
+    def spawn(self) -> None:
+        """
+        Forks one worker of the current generation.
+        """
+        pid = os.fork()
+        if pid:
+            self.workers[pid] = self.generation
+            return
+        # In the worker: leave reloads and Ctrl-C to the master.
+        signal.signal(signal.SIGHUP, signal.SIG_IGN)
+        signal.signal(signal.SIGINT, signal.SIG_IGN)
+        signal.signal(signal.SIGTERM, signal.SIG_DFL)
+        status = 0
+        try:
+            SERVERS[self.args.model](
+                self.args.app, self.sock, self.args.threads,
+                self.args.graceful_timeout, self.args.access_log)
+        except BaseException:
+            import traceback
+            traceback.print_exc()
+            status = 1
+        finally:
+            os._exit(status)
+
+    def stop_workers(self, pids: List[int]) -> None:
+        """
+        Asks workers to finish their in-flight requests and exit.
+
+        Args:
+            pids (List[int]): The workers to stop.
+        """
+        deadline = time.monotonic() + self.args.graceful_timeout
+        for pid in pids:
+            self.workers.pop(pid, None)
+            self.stopping[pid] = deadline
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    def reap(self) -> None:
+        """
+        Collects exited workers and kills stopping workers past their
+        deadline.
+        """
+        while True:
+            try:
+                pid, _ = os.waitpid(-1, os.WNOHANG)
+            except ChildProcessError:
+                return
+            if not pid:
+                break
+            if self.workers.pop(pid, None) is not None:
+                print(f'Worker {pid} died', file=sys.stderr)
+                self.respawn_after = time.monotonic() + 1.0
+            self.stopping.pop(pid, None)
+        now = time.monotonic()
+        for pid, deadline in list(self.stopping.items()):
+            if now > deadline:
+                try:
+                    os.kill(pid, signal.SIGKILL)
+                except ProcessLookupError:
+                    self.stopping.pop(pid, None)
+
+    def run(self) -> None:
+        """
+        Runs the master loop until all workers have stopped.
+        """
+        def request_reload(signum: int, frame: Any) -> None:
+            self.reload_requested = True
+
+        def request_stop(signum: int, frame: Any) -> None:
+            self.stop_requested = True
+
+        signal.signal(signal.SIGHUP, request_reload)
+        signal.signal(signal.SIGTERM, request_stop)
+        signal.signal(signal.SIGINT, request_stop)
+
+        while not self.stop_requested:
+            if self.reload_requested:
+                self.reload_requested = False
+                old = list(self.workers)
+                self.generation += 1
+                for _ in range(self.args.workers):
+                    self.spawn()
+                self.stop_workers(old)
+            while len(self.workers) < self.args.workers and \
+                    time.monotonic() >= self.respawn_after:
+                self.spawn()
+            self.reap()
+            time.sleep(0.2)
+
+        self.stop_workers(list(self.workers))
+        while self.stopping:
+            self.reap()
+            time.sleep(0.1)
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    """
+    Parses the command line, binds the socket and runs the master.
+
+    Args:
+        argv (Optional[List[str]]): Command line arguments, defaulting to
+        sys.argv.
+    """
+    parser = argparse.ArgumentParser(
+        description='Serve a Flask application with a pool of workers.')
+    parser.add_argument('app', help='module (or module:attribute) to serve, '
+                                    'e.g. corsapp or gateway')
+    parser.add_argument('--model', choices=MODELS, default='threaded')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8000)
+    parser.add_argument('--workers', type=int, default=available_cores(),
+                        help='worker processes (default: CPU cores)')
+    parser.add_argument('--threads', type=int, default=None,
+                        help='threads per worker, or concurrent '
+                             'connections per gevent worker')
+    parser.add_argument('--graceful-timeout', type=float, default=30.0)
+    parser.add_argument('--backlog', type=int, default=2048)
+    parser.add_argument('--access-log', action='store_true')
+    args = parser.parse_args(argv)
+    if args.threads is None:
+        args.threads = 1000 if args.model == 'gevent' else 16
+
+    if args.app.partition(':')[0] in SOCKETIO_APPS and args.workers > 1:
+        print(f'Warning: {args.app} uses Socket.IO, whose polling clients '
+              'need to reach the same worker on every request; consider '
+              '--workers 1', file=sys.stderr)
+
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    # Accepted connections inherit this; without it, servers that write the
+    # headers and the body separately stall on Nagle's algorithm.
+    sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+    sock.bind((args.host, args.port))
+    sock.listen(args.backlog)
+    sock.set_inheritable(True)
+    print(f'Serving {args.app} on http://{args.host}:{args.port} '
+          f'with {args.workers} {args.model} workers', file=sys.stderr)
+    Master(args, sock).run()
+
+
+if __name__ == '__main__':
+    main()
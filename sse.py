@@ -1,9 +1,21 @@
 from flask import Flask, Response, stream_with_context, render_template_string
 import time
+from config import get_config
+from instrumentation import init_instrumentation
+from json_provider import init_json
 from typing import Generator
 
 app: Flask = Flask(__name__)
 
+# Load the configuration for the current environment
+app.config.from_object(get_config())
+
+# Encode JSON with the fast provider and compress large responses
+init_json(app)
+
+# Track connection lifetimes and expose them at /_stats
+init_instrumentation(app)
+
 SSE_HTML: str = """
 <!DOCTYPE html>
 <html>
@@ -14,7 +26,7 @@ SSE_HTML: str = """
             var source;
             var reconnectAttempts = 0;
             var connect = function() {
-                source = new EventSource('/events');
+                source = new EventSource("{{ url_for('sse_request') }}");
 
                 source.onmessage = function(e) {
                     var dataDiv = document.getElementById('data');
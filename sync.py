@@ -6,18 +6,25 @@ import os
 import requests
 from flask import Flask, jsonify, request, render_template, Response
 from datetime import datetime, timedelta
-from config import BaseConfig, ProdConfig, TestConfig
+from config import get_config
+from instrumentation import init_instrumentation
+from json_provider import init_json
+from ratelimit import init_rate_limit
 from typing import Tuple, Union
 
 app: Flask = Flask(__name__)
 
-# Determine the environment and load the appropriate configuration
-if os.getenv('FLASK_ENV') == 'production':
-    app.config.from_object(ProdConfig)
-elif os.getenv('FLASK_ENV') == 'testing':
-    app.config.from_object(TestConfig)
-else:
-    app.config.from_object(BaseConfig)
+# Load the configuration for the current environment
+app.config.from_object(get_config())
+
+# Encode JSON with the fast provider and compress large responses
+init_json(app)
+
+# Track connection lifetimes and expose them at /_stats
+init_instrumentation(app)
+
+# Limit each client's request rate and shed load beyond capacity
+rate_limiter = init_rate_limit(app)
 
 
 class Charge:
@@ -60,6 +67,7 @@ def index() -> str:
 
 
 @app.route('/api/create_charge', methods=['POST'])
+@rate_limiter.limit()
 def create_charge() -> Tuple[Response, int]:
     """
     Creates a Stripe charge, returning details and latency.
@@ -80,7 +88,7 @@ def create_charge() -> Tuple[Response, int]:
 
     try:
         response: requests.Response = requests.post(
-            'https://api.stripe.com/v1/charges',
+            f"{app.config['STRIPE_API_BASE']}/v1/charges",
             auth=(stripe_api_key, ''),
             data={
                 'source': token,
@@ -1,17 +1,31 @@
 from flask import Flask, jsonify, Response
 from celery_config import make_celery
+from config import get_config
+from instrumentation import init_instrumentation
+from json_provider import SocketIOJSON, init_json
+from ratelimit import init_rate_limit, init_task_admission, refuse
 from flask_socketio import SocketIO
+from celery.signals import task_postrun
+from celery.utils import uuid
 import requests
 import time
 import logging
-from typing import Dict, List, Any
+import os
+from typing import Dict, List, Any, Optional
+
+# Seconds clients are asked to wait when too many tasks are outstanding,
+# about as long as one task takes.
+TASK_RETRY_AFTER: int = 5
 
 app: Flask = Flask(__name__, static_url_path='', static_folder='static')
+app.config.from_object(get_config())
 
 # Configure Celery with Redis as the broker and backend
 app.config.update(
-    CELERY_BROKER_URL='redis://localhost:6379/0',
-    RESULT_BACKEND='redis://localhost:6379/0'
+    CELERY_BROKER_URL=app.config['REDIS_URL'],
+    RESULT_BACKEND=app.config['REDIS_URL'],
+    # Where the worker writes its task metrics on shutdown (optional)
+    TASK_METRICS_DUMP_PATH=os.getenv('TASK_METRICS_DUMP_PATH')
 )
 
 # Initialize Celery
@@ -19,7 +33,20 @@ celery = make_celery(app)
 
 # Initialize Flask-SocketIO with Redis as the message queue
 # This approach allows the celery task to emit events to the client
-socketio = SocketIO(app, message_queue='redis://localhost:6379/0')
+socketio = SocketIO(app, message_queue=app.config['REDIS_URL'],
+                    json=SocketIOJSON)
+
+# Encode JSON with the fast provider and compress large responses
+init_json(app)
+
+# Track connection lifetimes and expose them at /_stats
+init_instrumentation(app)
+
+# Limit each client's request rate and shed load beyond capacity
+rate_limiter = init_rate_limit(app)
+
+# Bound the fetch tasks queued or running at once across all processes
+fetch_admission = init_task_admission(app, 'fetch_and_process_data')
 
 # Set up logging
 logging.basicConfig(level=logging.INFO)
@@ -40,7 +67,8 @@ def fetch_and_process_data(self) -> List[Dict[str, Any]]:
     """
     logging.info("Starting to fetch data from GitHub API.")
     # GitHub API endpoint for top 100 starred repositories
-    url: str = ("https://api.github.com/search/repositories"
+    url: str = (f"{app.config['GITHUB_API_BASE']}"
+                "/search/repositories"
                 "?q=stars:>1&sort=stars&order=desc&per_page=100")
     response = requests.get(
         url, headers={'Accept': 'application/vnd.github.v3+json'})
@@ -68,17 +96,43 @@ def fetch_and_process_data(self) -> List[Dict[str, Any]]:
     return processed_data
 
 
+@task_postrun.connect(sender=fetch_and_process_data, weak=False)
+def release_fetch_task(task_id: str, state: Optional[str] = None,
+                       **kwargs: Any) -> None:
+    """
+    Stops counting a fetch task against TASKS_MAX_OUTSTANDING once it has
+    finished, whether it succeeded or failed; a retried task stays counted.
+
+    Args:
+        task_id (str): The task's id.
+        state (Optional[str]): The task's final state.
+        **kwargs (Any): Remaining signal arguments.
+    """
+    if state != 'RETRY':
+        fetch_admission.release(task_id)
+
+
 @app.route('/api/fetch-github-data', methods=['GET'])
+# Each call queues a task taking several seconds
+@rate_limiter.limit(rate=0.2, burst=3)
 def fetch_github_data() -> Response:
     """
     Initiates the asynchronous task to fetch and process GitHub data.
 
     This endpoint triggers the 'fetch_and_process_data' task and returns the
-    task ID and status.
+    task ID and status, or sheds the request with 503 Service Unavailable
+    while TASKS_MAX_OUTSTANDING tasks are already queued or running.
 
     Returns:
         Response: JSON response containing the task ID and the status of the
         task initiation.
     """
-    task = fetch_and_process_data.delay()
+    task_id: str = uuid()
+    if not fetch_admission.admit(task_id):
+        return refuse('Too many tasks queued', 503, TASK_RETRY_AFTER)
+    try:
+        task = fetch_and_process_data.apply_async(task_id=task_id)
+    except Exception:
+        fetch_admission.release(task_id)
+        raise
     return jsonify({'task_id': task.id, 'status': 'Fetching GitHub data'})
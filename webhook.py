@@ -2,17 +2,21 @@ from flask import Flask, request, abort
 import stripe
 from typing import Any, Dict, Optional
 import os
+from config import get_config
+from instrumentation import init_instrumentation
+from json_provider import init_json
 from typing import Tuple
 
 app: Flask = Flask(__name__)
 
-# Determine the environment and load the appropriate configuration
-if os.getenv('FLASK_ENV') == 'production':
-    app.config.from_object('config.ProdConfig')
-elif os.getenv('FLASK_ENV') == 'testing':
-    app.config.from_object('config.TestConfig')
-else:
-    app.config.from_object('config.BaseConfig')
+# Load the configuration for the current environment
+app.config.from_object(get_config())
+
+# Encode JSON with the fast provider and compress large responses
+init_json(app)
+
+# Track connection lifetimes and expose them at /_stats
+init_instrumentation(app)
 
 
 @app.route('/api/webhook', methods=['POST'])
@@ -5,18 +5,26 @@ import os
 import stripe
 from typing import Dict, Any, Tuple, Union
 from datetime import datetime, timedelta
+from config import get_config
+from instrumentation import init_instrumentation
+from json_provider import SocketIOJSON, init_json
+from ratelimit import init_rate_limit
 
 # Initialize Flask app and Flask-SocketIO
 app: Flask = Flask(__name__)
-socketio: SocketIO = SocketIO(app)
+socketio: SocketIO = SocketIO(app, json=SocketIOJSON)
 
 # Load configurations based on the environment
-if os.getenv('FLASK_ENV') == 'production':
-    app.config.from_object('config.ProdConfig')
-elif os.getenv('FLASK_ENV') == 'testing':
-    app.config.from_object('config.TestConfig')
-else:
-    app.config.from_object('config.BaseConfig')
+app.config.from_object(get_config())
+
+# Encode JSON with the fast provider and compress large responses
+init_json(app)
+
+# Track connection lifetimes and expose them at /_stats
+init_instrumentation(app)
+
+# Limit each client's request rate and shed load beyond capacity
+rate_limiter = init_rate_limit(app)
 
 
 @app.route('/')
@@ -59,6 +67,7 @@ class Charge:
 
 
 @app.route('/api/create_charge', methods=['POST'])
+@rate_limiter.limit()
 def create_charge() -> Tuple[Response, int]:
     """
     Creates a Stripe charge, returning details and latency.
@@ -78,7 +87,7 @@ def create_charge() -> Tuple[Response, int]:
 
     try:
         response: requests.Response = requests.post(
-            'https://api.stripe.com/v1/charges',
+            f"{app.config['STRIPE_API_BASE']}/v1/charges",
             auth=(stripe_api_key, ''),
             data={
                 'source': token,